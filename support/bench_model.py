@@ -0,0 +1,98 @@
+# BSD 3-Clause License
+# 
+# Copyright (c) 2018, DEMCON advanced mechatronics
+# All rights reserved.
+# 
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# 
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+# 
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+# 
+# * Neither the name of the copyright holder nor the names of its
+#   contributors may be used to endorse or promote products derived from
+#   this software without specific prior written permission.
+# 
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+# 
+'''
+Memory benchmark of XpcModel versus CompactModel
+
+Builds both model representations from synthetic ModelTables (no target or
+dll needed) and reports the memory allocated for each, the build time and the
+time of a full garbage collection with the model alive. Build times include
+the tracemalloc overhead.
+
+Usage: python bench_model.py [number of signals] [number of parameters]
+'''
+
+import gc
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from xpcapi import XpcModel, CompactModel, ModelTables
+
+
+class DummyXpc:
+    '''Stands in for XpcApi, the models do not call it when built from tables'''
+
+
+def syntheticTables(numSignals, numParams):
+    def block(i):
+        return 'Model/Subsystem %d/Block %d' % (i // 1000, (i // 10) % 100)
+    
+    return ModelTables(
+        [block(i) + '/Signal %d' % i for i in range(numSignals)],
+        ['' if i % 10 else 'label%d' % i for i in range(numSignals)],
+        [block(i) for i in range(numParams)],
+        ['Param%d' % i for i in range(numParams)],
+        None, None
+        )
+
+
+def measure(name, build):
+    gc.collect()
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    model = build()
+    buildTime = time.perf_counter() - t0
+    
+    t0 = time.perf_counter()
+    gc.collect()
+    gcTime = time.perf_counter() - t0
+    
+    size, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    
+    print('%-14s %8.1f MB %8.1f MB peak %8.2f s build %8.1f ms gc' % 
+          (name, size / 2**20, peak / 2**20, buildTime, gcTime * 1000))
+    return model
+
+
+if __name__ == '__main__':
+    numSignals = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    numParams = int(sys.argv[2]) if len(sys.argv) > 2 else numSignals // 2
+    
+    tables = syntheticTables(numSignals, numParams)
+    xpc = DummyXpc()
+    
+    print('%d signals, %d parameters' % (numSignals, numParams))
+    measure('XpcModel', lambda: XpcModel(xpc, tables = tables))
+    measure('CompactModel', lambda: CompactModel(xpc, tables))
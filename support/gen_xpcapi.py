@@ -87,7 +87,7 @@ for f in p.ext:
         
         methodname = f.name[3].lower() + f.name[4:]
         
-        classcode += '    def %s(self, %s):\n        retval = self._lib.%s(%s)\n        self._checkerror()\n        return retval\n' % (methodname, ','.join(methodparams), f.name, ','.join(libparams))
+        classcode += '    def %s(self, %s):\n        with self._lock:\n            retval = self._lib.%s(%s)\n            self._checkerror()\n        return retval\n' % (methodname, ','.join(methodparams), f.name, ','.join(libparams))
         
 
 ## xpciapconst constants
@@ -145,6 +145,7 @@ of.write( """\
 from enum import IntEnum
 from ctypes import *
 from .xpcapitypes import *
+import threading
 
 int = c_int
 void = None
@@ -184,10 +185,27 @@ else:
 class XpcError(IOError):
     pass
 
+# The lock shared by all connections using the same dll (see _xpcapi)
+GLOBAL_LOCK = threading.RLock()
+
 class _xpcapi:
-    def __init__(self, lib):
+    '''
+    Wrappers of the xpcapi.dll functions
+    
+    Every call and the check of its error code are done while holding lock.
+    The error code of xpcapi.dll (xPCGetLastError) is global to the loaded
+    dll, so errors are only reported on the connection that caused them if
+    no other call on the same dll runs in between. Instances sharing a dll
+    must therefore share their lock, which is GLOBAL_LOCK by default: they
+    can be used from any thread, but all calls are serialized.
+    
+    An instance with its own copy of the dll (see XpcApi) can use a lock of
+    its own (e.g. lock = threading.RLock()) and run in parallel with others.
+    '''
+    def __init__(self, lib, lock = None):
         self._lib = lib
         self._port = -1
+        self._lock = GLOBAL_LOCK if lock is None else lock
 %s
 %s
     def _checkerror(self):
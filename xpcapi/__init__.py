@@ -30,26 +30,76 @@
 # 
 
 from ._xpcapi import (
-    _xpcapi, XpcError, decode, dirStruct,
+    _xpcapi, XpcError, decode, dirStruct, GLOBAL_LOCK,
     MAX_ERR_MSG_LENGTH, MAX_SCOPES, MAX_SIGNALS,
     COMMTYP, SCTYPE, TRIGMD, TRIGSLOPE, SCMODE, SCST, LGMOD
     )
+from ._modelcache import (
+    ModelTables, ModelCache, fetchModelTables, fetchModelTablesXML, parseModelXML,
+    defaultCacheDir, hashFile
+    )
+from ._acquisition import ScopeAcquisition, RingBuffer, Frame
+from ._capture import Capture, CaptureResult
+from ._logreader import LogReader
+from ._export import ColumnWriter, ColumnStore, exportScope, exportLog
+from ._sync import SyncResult, syncDir, walkDir
+from ._async import AsyncXpcApi, AsyncXpcScope, AsyncXpcFile
+from ._pool import XpcTargetPool, PoolResult, LogsResult
+from .xpcapitypes import scopedata
     
 import ctypes
 import os
 import string
 import sys
 import datetime
+import io
+import time
 from collections import namedtuple
 import itertools
+import re
+import bisect
+import threading
+import shutil
+import tempfile
+from array import array
+
+import numpy as np
+
+class XpcConnectionError(XpcError):
+    """
+    Raised by a resilient XpcApi when the connection to the target was lost,
+    and by its calls while it reconnects. Once the connection has been
+    restored (alive), the failed call can be retried.
+    """
+    pass
+
 
 def sanitizeName(name):
     """Replace all non-alphanumeric characters in name to alpha-numeric characters"""
     return ''.join(c if c.isalnum() else '_' for c in name)
     
+    
+def _globToRegex(pattern):
+    """Translate a glob pattern on a /-separated path to a regular expression"""
+    regex = ''
+    for part in re.split(r'(\*\*|\*|\?|\[[^\]]*\])', pattern):
+        if part == '**':
+            regex += '.*'
+        elif part == '*':
+            regex += '[^/]*'
+        elif part == '?':
+            regex += '[^/]'
+        elif part.startswith('[') and part.endswith(']') and len(part) > 2:
+            regex += '[' + ('^' + part[2:-1] if part[1] == '!' else part[1:-1]) + ']'
+        else:
+            regex += re.escape(part)
+    return regex
+    
 
 class XpcParam:
     """Represents a parameter of an XpcBlock"""
+    __slots__ = ('_xpc', '_model', '_path', '_index')
+    
     def __init__(self, model, path, index):
         self._xpc = model._xpc
         self._model = model
@@ -62,12 +112,21 @@ class XpcParam:
         else: # Write
             self._xpc.setParam(self._index, value)
     
+    def __getitem__(self, index):
+        rows, cols = self._xpc.params.dims(self._index)
+        return self._xpc._getParamValues(self._index, rows, cols)[index]
+        
+    def __setitem__(self, index, value):
+        self._xpc.setParam(self._index, value, index)
+    
     def __repr__(self):
         return '<XpcParam %d (%s) = %s>' % (self._index, self._path, self())
         
         
 class XpcSignal:
     """Represents a signal of an XpcBlock"""
+    __slots__ = ('_xpc', '_path', '_index')
+    
     def __init__(self, xpc, path, index):
         self._xpc = xpc
         self._path = path
@@ -83,6 +142,92 @@ class XpcSignal:
         return self._index
 
 
+class SignalGroup:
+    """A fixed set of signals that is read in a single xPCGetSignals call
+    
+    The index and result buffers are allocated once, when the group is created,
+    so reading the group does not allocate. Signals can be given as signal
+    indices, XpcSignal objects or full signal names (block path + '/' + signal
+    name).
+    
+    read() returns a NumPy view on the internal result buffer, which is
+    overwritten by the next read. Pass out= to copy the values into an array
+    owned by the caller instead.
+    """
+    def __init__(self, xpc, signals):
+        self._xpc = xpc
+        self._signals = list(signals)
+        
+        indices = [self._resolve(signal) for signal in self._signals]
+        
+        self._num = len(indices)
+        self._indices = (ctypes.c_int * self._num)(*indices)
+        self._values = (ctypes.c_double * self._num)()
+        self._array = np.frombuffer(self._values, dtype = np.float64)
+        
+    def _resolve(self, signal):
+        item = signal
+        if isinstance(item, str):
+            if self._xpc._model is not None:
+                # Use the path index of the model instead of asking the target
+                try:
+                    item = self._xpc.model[item]
+                except KeyError:
+                    item = None
+            else:
+                index = self._xpc.getSignalIdx(item)
+                return index if index >= 0 else self._unknown(signal)
+        
+        if isinstance(item, XpcSignal):
+            return item._index
+        if isinstance(item, (int, np.integer)) and not isinstance(item, bool):
+            return int(item)
+        return self._unknown(signal)
+    
+    @staticmethod
+    def _unknown(signal):
+        raise ValueError('unknown signal %s' % (signal,))
+    
+    @property
+    def indices(self):
+        return list(self._indices)
+    
+    def read(self, out = None):
+        '''
+        Read all signals of the group, returns a NumPy array with one value per
+        signal, in the order the signals were given
+        '''
+        _xpcapi.getSignals(self._xpc, self._num, self._indices, self._values)
+        
+        if out is None:
+            return self._array
+        
+        out[...] = self._array
+        return out
+    
+    __call__ = read
+    
+    def __len__(self):
+        return self._num
+    
+    def __repr__(self):
+        return '<SignalGroup of %d signals>' % self._num
+
+
+class _ReadPlan:
+    """The SignalGroup and result names used by XpcBlock.read"""
+    def __init__(self, xpc, names, signals):
+        self.names = names
+        self.group = SignalGroup(xpc, signals)
+        self.dtype = np.dtype([(name, np.float64) for name in names])
+        
+    def read(self, asArray):
+        values = self.group.read()
+        if asArray:
+            return values.copy().view(self.dtype)[0]
+        return dict(zip(self.names, values.tolist()))
+
+
 class XpcBlock:
     """Represents a (sub-)block of an xpc model"""
     
@@ -94,6 +239,8 @@ class XpcBlock:
         self.__dict__['_blocks_'] = {}
         self.__dict__['_model_'] = model
         self.__dict__['_path_'] = path
+        self.__dict__['_pending_'] = False
+        self.__dict__['_readPlans_'] = {}
 
         
     def _getBlock(self, path):
@@ -116,15 +263,22 @@ class XpcBlock:
         first, _, rest = path.partition('/')
         saneFirst = sanitizeName(first)
         
+        if self._path_ == '':
+            subpath = first
+        else:
+            subpath = self._path_ + '/' + first
+        
         try:
             subblock =  self._blocks_[saneFirst]
         except KeyError:
-            if self._path_ == '':
-                subpath = first
-            else:
-                subpath = self._path_ + '/' + first
-                
-            subblock = self._blocks_[saneFirst] = XpcBlock(self, subpath)
+            subblock = self._blocks_[saneFirst] = XpcBlock(self._model_, subpath)
+            self._model_._addToIndex(subpath, subblock)
+        
+        if subblock._pending_:
+            # A provisional block of a lazy model, it exists after all
+            subblock.__dict__['_path_'] = subpath
+            subblock.__dict__['_pending_'] = False
+            self._model_._addToIndex(subpath, subblock)
         
         if rest == '':
             return subblock
@@ -132,6 +286,8 @@ class XpcBlock:
             return subblock._getBlock(rest)
             
     def tree(self, indent = ''):
+        self._model_._complete()
+        
         ret = indent + (self._path_ or 'model root')
         
         for subblock in self._blocks_.values():
@@ -139,7 +295,38 @@ class XpcBlock:
         
         return ret
     
+    def _subtreeSignals(self, prefix, recursive):
+        items = [(prefix + name, signal) for name, signal in self._signals_.items()]
+        if recursive:
+            for name, subblock in self._blocks_.items():
+                items += subblock._subtreeSignals(prefix + name + '.', True)
+        return items
+    
+    def read(self, recursive = False, asArray = False):
+        '''
+        Read all signals of this block in a single call
+        
+        Returns a dict of signal values keyed by the (sanitized) signal names,
+        or with asArray a NumPy structured array with a field per signal. With
+        recursive, the signals of all sub-blocks are included as well, keyed by
+        their relative dotted path (e.g. 'PID.u').
+        
+        The list of signals to read is determined on the first call and kept by
+        the block.
+        '''
+        try:
+            plan = self._readPlans_[recursive]
+        except KeyError:
+            self._model_._complete()
+            items = self._subtreeSignals('', recursive)
+            plan = self._readPlans_[recursive] = _ReadPlan(
+                self._model_._xpc, [name for name, _ in items], [signal for _, signal in items])
+        
+        return plan.read(asArray)
+        
     def __dir__(self):
+        self._model_._complete()
+        
         return list(
             set(object.__dir__(self)) |
             set(self._blocks_.keys()) |
@@ -147,20 +334,31 @@ class XpcBlock:
             set(self._params_.keys())
             )
 
-        
-    def __getattr__(self, attr):
+    def _member(self, attr):
         if attr in self._blocks_:
             return self._blocks_[attr]
         if attr in self._signals_:
             return self._signals_[attr]
         if attr in self._params_:
             return self._params_[attr]
-        raise AttributeError
+        return None
+        
+    def __getattr__(self, attr):
+        member = self._member(attr)
+        if member is not None:
+            return member
+        if attr.startswith('_'):
+            # Private names and probes such as _repr_html_ are never looked up
+            # on the target
+            raise AttributeError(attr)
+        return self._model_._resolve(self, attr)
     
     def __setattr__(self, attr, value):
         raise AttributeError
             
     def __repr__(self):
+        if self._pending_:
+            return '<xpcblock %s (unverified)>' % self._path_
         return '<xpcblock %s>' % self._path_
             
             
@@ -168,22 +366,604 @@ class XpcBlock:
                    
 
 class XpcModel(XpcBlock):
-    def __init__(self, xpc):
+    """
+    The block tree of the loaded application
+    
+    By default all signal and parameter names are fetched when the model is
+    created. A lazy model (lazy = True) fetches names only when they are needed:
+    
+    * Attribute access first looks up the requested signal or parameter
+      directly on the target (getSignalIdx, getParamIdx and the signal labels),
+      which costs a few calls regardless of the model size.
+    * An attribute without '_' that is not a signal or parameter is returned
+      as a provisional block, without enumerating, so chains like
+      model.Plant.Motor.Speed only cost the lookup of Speed. A provisional
+      block is confirmed once a member is found in it, and removed when the
+      enumeration is complete and it turned out not to exist. Until then,
+      misspelled block names also return a (provisional) block, shown as
+      unverified.
+    * Names that may have been changed by sanitizeName (i.e. containing '_')
+      cannot be looked up directly. For those, the names are enumerated in
+      batches of batchSize until the attribute is found; a name that does not
+      exist raises AttributeError after enumerating all names.
+    * Names starting with '_' are never looked up on the target.
+    * dir(), tree() and searching the model enumerate all remaining names.
+    
+    A model can also be built from ModelTables (e.g. from a ModelCache),
+    without any calls to the target.
+    
+    Blocks, signals and parameters can also be looked up by their full path,
+    using the actual (not sanitized) names, e.g. model['Plant/Motor 1/Speed'].
+    Signals can also be found by their label (block path + '/' + label).
+    find() and search() return everything matching a glob pattern or a
+    regular expression.
+    """
+    batchSize = 256
+    
+    def __init__(self, xpc, lazy = False, tables = None):
+        # The path index has to exist before any blocks are added
+        self.__dict__['_index_'] = {}
+        self.__dict__['_sortedPaths_'] = None
+        
         XpcBlock.__init__(self, self, '')
         
         self.__dict__['_xpc'] = xpc
-        for i in range(xpc.getNumSignals()):
-            block, _, signal = xpc.getSignalName(i).rpartition('/')
-            label = xpc.getSignalLabel(i)
-            if not label:
-                label = signal
+        self.__dict__['_lazy'] = lazy
+        self.__dict__['_nextSignal'] = 0
+        self.__dict__['_nextParam'] = 0
+        self.__dict__['_knownSignals'] = set()
+        self.__dict__['_knownParams'] = set()
+        
+        if tables is not None:
+            self.__dict__['_numSignals'] = len(tables.signalNames)
+            self.__dict__['_numParams'] = len(tables.paramNames)
+            self._addTables(tables)
+            return
+        
+        self.__dict__['_numSignals'] = xpc.getNumSignals()
+        self.__dict__['_numParams'] = xpc.getNumParams()
+        
+        if not lazy:
+            self._complete()
+    
+    def _addTables(self, tables):
+        for i, (name, label) in enumerate(zip(tables.signalNames, tables.signalLabels)):
+            self._addSignal(i, name, label)
+        for i, (block, param) in enumerate(zip(tables.paramBlocks, tables.paramNames)):
+            self._addParam(i, block, param)
+        
+        self.__dict__['_nextSignal'] = self._numSignals
+        self.__dict__['_nextParam'] = self._numParams
+    
+    def _addSignal(self, i, name, label):
+        if i in self._knownSignals:
+            return
+        self._knownSignals.add(i)
+        
+        block, _, signal = name.rpartition('/')
+        xpcSignal = XpcSignal(self._xpc, block + '/' + signal, i)
+        
+        self._addToIndex(block + '/' + signal, xpcSignal)
+        if label:
+            self._index_.setdefault(block + '/' + label, xpcSignal)
+        else:
+            label = signal
+            
+        self._getBlock(block)._signals_[sanitizeName(label)] = xpcSignal
+    
+    def _addParam(self, i, block, param):
+        if i in self._knownParams:
+            return
+        self._knownParams.add(i)
+        
+        xpcParam = XpcParam(self, block + '/' + param, i)
+        self._addToIndex(block + '/' + param, xpcParam)
+        self._getBlock(block)._params_[sanitizeName(param)] = xpcParam
+    
+    def _addToIndex(self, path, item):
+        self._index_[path] = item
+        self.__dict__['_sortedPaths_'] = None
+        
+    def _enumerate(self, count):
+        """
+        Add the next count signals and parameters to the tree, returns whether
+        there are any left
+        """
+        xpc = self._xpc
+        
+        # The name buffers are reused for the whole batch
+        name = ctypes.create_string_buffer(256)
+        label = ctypes.create_string_buffer(256)
+        
+        first = self._nextSignal
+        last = min(first + count, self._numSignals)
+        for i in range(first, last):
+            if i not in self._knownSignals:
+                _xpcapi.getSignalName(xpc, i, name)
+                _xpcapi.getSignalLabel(xpc, i, label)
+                self._addSignal(i, decode(name.value), decode(label.value))
+        self.__dict__['_nextSignal'] = last
+        count -= last - first
+        
+        first = self._nextParam
+        last = min(first + count, self._numParams)
+        for i in range(first, last):
+            if i not in self._knownParams:
+                self._addParam(i, *xpc.params.name(i))
+        self.__dict__['_nextParam'] = last
+        
+        if self._isComplete():
+            self._purge()
+            return False
+        return True
+    
+    def _isComplete(self):
+        return self._nextSignal == self._numSignals and self._nextParam == self._numParams
+        
+    def _complete(self):
+        """Add all remaining signals and parameters to the tree"""
+        if self._isComplete():
+            return
+        
+        while self._enumerate(self.batchSize):
+            pass
+    
+    def _purge(self):
+        """Remove provisional blocks that turned out not to exist"""
+        def purge(block):
+            for attr, subblock in list(block._blocks_.items()):
+                if subblock._pending_:
+                    del block._blocks_[attr]
+                else:
+                    purge(subblock)
+        purge(self)
+    
+    def _lookup(self, block, attr):
+        """
+        Look up a signal or parameter named attr in block directly on the
+        target, and add it to the tree if it exists
+        """
+        xpc = self._xpc
+        path = block._path_ + '/' + attr if block._path_ else attr
+        
+        try:
+            i = xpc.getSignalIdx(path)
+            if i >= 0:
+                self._addSignal(i, path, xpc.getSignalLabel(i))
+        except XpcError:
+            pass
+        
+        try:
+            i = xpc.params.index(block._path_, attr)
+            if i >= 0:
+                self._addParam(i, block._path_, attr)
+        except XpcError:
+            pass
+        
+        try:
+            if xpc.getSigLabelWidth(attr) > 0:
+                for i in xpc.getSigIdxfromLabel(attr):
+                    self._addSignal(i, xpc.getSignalName(i), attr)
+        except XpcError:
+            pass
+        
+        return block._member(attr)
+            
+    def _resolve(self, block, attr):
+        """Find attribute attr of block, which is not in the tree (yet)"""
+        if self._isComplete():
+            raise AttributeError(attr)
+        
+        member = self._lookup(block, attr)
+        if member is not None:
+            return member
+        
+        if '_' not in attr:
+            # attr is the actual name, so this must be a (not yet known) block
+            subblock = XpcBlock(self, block._path_ + '/' + attr if block._path_ else attr)
+            subblock.__dict__['_pending_'] = True
+            block._blocks_[attr] = subblock
+            return subblock
+        
+        while self._enumerate(self.batchSize):
+            member = block._member(attr)
+            if member is not None and not block._pending_ and not getattr(member, '_pending_', False):
+                return member
+        
+        self._complete()
+        
+        member = block._member(attr)
+        if member is None or block._pending_ or getattr(member, '_pending_', False):
+            raise AttributeError(attr)
+        return member
+    
+    def __getitem__(self, path):
+        '''Get a block, signal or parameter by its full path'''
+        try:
+            return self._index_[path]
+        except KeyError:
+            pass
+        
+        if not self._isComplete():
+            # Try the target first, for a lazy model
+            try:
+                i = self._xpc.getSignalIdx(path)
+                if i >= 0:
+                    self._addSignal(i, path, self._xpc.getSignalLabel(i))
+                    return self._index_[path]
+            except XpcError:
+                pass
+            
+            self._complete()
+        
+        return self._index_[path]
+    
+    def __contains__(self, path):
+        try:
+            self[path]
+        except KeyError:
+            return False
+        return True
+    
+    def _paths(self):
+        '''All indexed paths, sorted'''
+        self._complete()
+        
+        if self._sortedPaths_ is None:
+            self.__dict__['_sortedPaths_'] = sorted(self._index_)
+        return self._sortedPaths_
+    
+    def find(self, pattern):
+        '''
+        Find blocks, signals and parameters with a path matching a glob pattern
+        
+        In the pattern, '*' matches any part of a name, '**' matches any number
+        of path elements, '?' matches a single character and [...] a set of
+        characters, e.g. model.find('Controller/*/Error').
+        '''
+        regex = re.compile(_globToRegex(pattern) + r'\Z')
+        
+        # Only paths starting with the literal part of the pattern can match
+        prefix = re.split(r'[*?[]', pattern, 1)[0]
+        paths = self._paths()
+        
+        matches = []
+        for i in range(bisect.bisect_left(paths, prefix), len(paths)):
+            path = paths[i]
+            if not path.startswith(prefix):
+                break
+            if regex.match(path):
+                matches.append(path)
+        return self._unique(matches)
+    
+    def search(self, regex):
+        '''Find blocks, signals and parameters with a path matching a regular expression'''
+        regex = re.compile(regex)
+        return self._unique(path for path in self._paths() if regex.search(path))
+    
+    def _unique(self, paths):
+        # Labelled signals are indexed under both their name and their label
+        items = {}
+        for path in paths:
+            item = self._index_[path]
+            items.setdefault(id(item), item)
+        return list(items.values())
+    
+    def signalGroup(self, pattern):
+        '''
+        Create a SignalGroup of the signals matching a glob pattern, or of a 
+        list of signal paths
+        '''
+        if isinstance(pattern, str):
+            signals = [item for item in self.find(pattern) if isinstance(item, XpcSignal)]
+        else:
+            signals = [self[path] for path in pattern]
+        
+        return SignalGroup(self._xpc, signals)
+        
+    def __repr__(self):
+        return '<xpcmodel>'
+        
+
+class CompactBlock:
+    """
+    A block of a CompactModel
+    
+    CompactBlocks, and the XpcSignals and XpcParams found through them, are
+    lightweight proxies that are created on access. They behave like
+    XpcBlocks for attribute access.
+    """
+    __slots__ = ('_model_', '_id_')
+    
+    def __init__(self, model, id):
+        object.__setattr__(self, '_model_', model)
+        object.__setattr__(self, '_id_', id)
+        
+    @property
+    def _path_(self):
+        return self._model_._blockPath(self._id_)
+    
+    def tree(self, indent = ''):
+        ret = indent + (self._path_ or 'model root')
+        
+        for subblock in self._model_._members(self._id_, CompactModel.BLOCK):
+            ret += '\n' + subblock.tree(indent + '  ')
+        
+        return ret
+    
+    def __dir__(self):
+        return list(set(object.__dir__(self)) | set(self._model_._memberNames(self._id_)))
+    
+    def read(self, recursive = False, asArray = False):
+        '''Read all signals of this block in a single call, see XpcBlock.read'''
+        return self._model_._readBlock(self._id_, recursive, asArray)
+    
+    def __getattr__(self, attr):
+        if attr.startswith('__'):
+            raise AttributeError(attr)
+        return self._model_._member(self._id_, attr)
+    
+    def __setattr__(self, attr, value):
+        raise AttributeError
+    
+    def __eq__(self, other):
+        return isinstance(other, CompactBlock) and other._model_ is self._model_ and other._id_ == self._id_
+    
+    def __hash__(self):
+        return hash(self._id_)
+    
+    def __repr__(self):
+        return '<xpcblock %s>' % self._path_
+
+
+class CompactModel(CompactBlock):
+    """
+    Memory efficient alternative to XpcModel, for very large models
+    
+    The model is stored in a few flat tables instead of a tree of objects:
+    
+    * All block, signal and parameter names are stored once, concatenated in a
+      single string with an array of offsets.
+    * Blocks, signals and parameters are arrays of name indices and parent
+      block indices.
+    * The children of all blocks are arrays sorted by parent block and
+      sanitized name, which are searched by bisection.
+    
+    Blocks, signals and parameters are returned as proxy objects created on
+    access. Path lookup (model[path]) costs a bisection per path element.
+    find() and search() scan all paths.
+    """
+    __slots__ = ('_xpc', '_readPlans', '_names', '_nameOffsets', '_blockParent', '_blockName',
+                 '_childBlock', '_childName', '_childCode',
+                 '_signalBlock', '_signalName', '_signalLabel', '_paramBlock', '_paramName')
+    
+    # Kinds of children, in order of precedence for attribute access
+    BLOCK, SIGNAL, PARAM = 0, 1, 2
+    
+    def __init__(self, xpc, tables):
+        CompactBlock.__init__(self, self, 0)
+        
+        set = lambda attr, value: object.__setattr__(self, attr, value)
+        set('_xpc', xpc)
+        set('_readPlans', {})
+        set('_blockParent', array('i', [-1]))
+        set('_blockName', array('i', [0]))
+        set('_signalBlock', array('i'))
+        set('_signalName', array('i'))
+        set('_signalLabel', array('i'))
+        set('_paramBlock', array('i'))
+        set('_paramName', array('i'))
+        
+        # Lookup tables that are only used while building
+        names = ['']
+        nameIds = {'': 0}
+        blockIds = {'': 0}
+        children = {}
+        
+        def nameId(name):
+            try:
+                return nameIds[name]
+            except KeyError:
+                id = nameIds[name] = len(names)
+                names.append(name)
+                return id
+        
+        def addChild(blockId, name, id, kind):
+            key = blockId, sanitizeName(name)
+            existing = children.get(key)
+            if existing is None or kind <= existing[0] & 3:
+                children[key] = id << 2 | kind, nameId(name)
+        
+        def addBlock(path):
+            # Find the nearest known ancestor, then add the blocks below it
+            missing = []
+            while path not in blockIds:
+                missing.append(path)
+                path = path.rpartition('/')[0]
+            
+            id = blockIds[path]
+            for path in reversed(missing):
+                parentId = id
+                name = path.rpartition('/')[2]
                 
-            self._getBlock(block)._signals_[sanitizeName(label)] = XpcSignal(self._xpc, block + '/' + signal, i)
+                existing = children.get((parentId, sanitizeName(name)))
+                if existing is not None and existing[0] & 3 == self.BLOCK:
+                    id = existing[0] >> 2
+                else:
+                    id = len(self._blockParent)
+                    self._blockParent.append(parentId)
+                    self._blockName.append(nameId(name))
+                    addChild(parentId, name, id, self.BLOCK)
+                
+                blockIds[path] = id
+            return id
+        
+        for i, (name, label) in enumerate(zip(tables.signalNames, tables.signalLabels)):
+            block, _, signal = name.rpartition('/')
+            blockId = addBlock(block)
             
-        for i in range(xpc.getNumParams()):
-            block, param = xpc.getParamName(i)
-            self._getBlock(block)._params_[sanitizeName(param)] = XpcParam(self, block + '/' + param, i)
+            self._signalBlock.append(blockId)
+            self._signalName.append(nameId(signal))
+            self._signalLabel.append(nameId(label))
+            addChild(blockId, label or signal, i, self.SIGNAL)
             
+        for i, (block, param) in enumerate(zip(tables.paramBlocks, tables.paramNames)):
+            blockId = addBlock(block)
+            
+            self._paramBlock.append(blockId)
+            self._paramName.append(nameId(param))
+            addChild(blockId, param, i, self.PARAM)
+        
+        offsets = array('i', [0])
+        for name in names:
+            offsets.append(offsets[-1] + len(name))
+        set('_names', ''.join(names))
+        set('_nameOffsets', offsets)
+        
+        keys = sorted(children)
+        set('_childBlock', array('i', (blockId for blockId, _ in keys)))
+        set('_childCode', array('i', (children[key][0] for key in keys)))
+        set('_childName', array('i', (children[key][1] for key in keys)))
+    
+    def _name(self, nameId):
+        return self._names[self._nameOffsets[nameId]:self._nameOffsets[nameId + 1]]
+    
+    def _blockPath(self, blockId):
+        names = []
+        while blockId > 0:
+            names.append(self._name(self._blockName[blockId]))
+            blockId = self._blockParent[blockId]
+        return '/'.join(reversed(names))
+    
+    def _signalPath(self, i):
+        return self._blockPath(self._signalBlock[i]) + '/' + self._name(self._signalName[i])
+    
+    def _paramPath(self, i):
+        return self._blockPath(self._paramBlock[i]) + '/' + self._name(self._paramName[i])
+    
+    def _proxy(self, code):
+        id, kind = code >> 2, code & 3
+        if kind == self.BLOCK:
+            return CompactBlock(self, id)
+        if kind == self.SIGNAL:
+            return XpcSignal(self._xpc, self._signalPath(id), id)
+        return XpcParam(self, self._paramPath(id), id)
+    
+    def _childRange(self, blockId):
+        return (bisect.bisect_left(self._childBlock, blockId),
+                bisect.bisect_right(self._childBlock, blockId))
+    
+    def _findChild(self, blockId, attr):
+        '''Returns the position of the child of blockId with sanitized name attr, or -1'''
+        lo, hi = self._childRange(blockId)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            name = sanitizeName(self._name(self._childName[mid]))
+            if name == attr:
+                return mid
+            elif name < attr:
+                lo = mid + 1
+            else:
+                hi = mid
+        return -1
+    
+    def _member(self, blockId, attr):
+        pos = self._findChild(blockId, attr)
+        if pos < 0:
+            raise AttributeError(attr)
+        return self._proxy(self._childCode[pos])
+    
+    def _memberNames(self, blockId):
+        lo, hi = self._childRange(blockId)
+        return [sanitizeName(self._name(self._childName[pos])) for pos in range(lo, hi)]
+    
+    def _members(self, blockId, kind):
+        lo, hi = self._childRange(blockId)
+        return [self._proxy(self._childCode[pos]) for pos in range(lo, hi)
+                if self._childCode[pos] & 3 == kind]
+    
+    def _subtreeSignals(self, blockId, prefix, recursive):
+        lo, hi = self._childRange(blockId)
+        items = []
+        for pos in range(lo, hi):
+            code = self._childCode[pos]
+            name = sanitizeName(self._name(self._childName[pos]))
+            if code & 3 == self.SIGNAL:
+                items.append((prefix + name, self._proxy(code)))
+            elif code & 3 == self.BLOCK and recursive:
+                items += self._subtreeSignals(code >> 2, prefix + name + '.', True)
+        return items
+    
+    def _readBlock(self, blockId, recursive, asArray):
+        try:
+            plan = self._readPlans[blockId, recursive]
+        except KeyError:
+            items = self._subtreeSignals(blockId, '', recursive)
+            plan = self._readPlans[blockId, recursive] = _ReadPlan(
+                self._xpc, [name for name, _ in items], [signal for _, signal in items])
+        
+        return plan.read(asArray)
+    
+    def __getitem__(self, path):
+        '''Get a block, signal or parameter by its full path'''
+        blockId = 0
+        *blocks, name = path.split('/')
+        
+        # Children are found by their sanitized name, check the actual name as well
+        for block in blocks:
+            pos = self._findChild(blockId, sanitizeName(block))
+            if pos < 0 or self._childCode[pos] & 3 != self.BLOCK or self._name(self._childName[pos]) != block:
+                raise KeyError(path)
+            blockId = self._childCode[pos] >> 2
+        
+        pos = self._findChild(blockId, sanitizeName(name))
+        if pos >= 0 and self._name(self._childName[pos]) == name:
+            return self._proxy(self._childCode[pos])
+        
+        # Labelled signals are only stored under their label, look for the name
+        for i, signalBlock in enumerate(self._signalBlock):
+            if signalBlock == blockId and self._name(self._signalName[i]) == name:
+                return self._proxy(i << 2 | self.SIGNAL)
+        
+        raise KeyError(path)
+    
+    def __contains__(self, path):
+        try:
+            self[path]
+        except KeyError:
+            return False
+        return True
+        
+    def _paths(self):
+        for i in range(1, len(self._blockParent)):
+            yield self._blockPath(i), i << 2 | self.BLOCK
+        for i in range(len(self._signalBlock)):
+            yield self._signalPath(i), i << 2 | self.SIGNAL
+        for i in range(len(self._paramBlock)):
+            yield self._paramPath(i), i << 2 | self.PARAM
+    
+    def find(self, pattern):
+        '''Find blocks, signals and parameters with a path matching a glob pattern, see XpcModel.find'''
+        regex = re.compile(_globToRegex(pattern) + r'\Z')
+        return [self._proxy(code) for path, code in self._paths() if regex.match(path)]
+    
+    def search(self, regex):
+        '''Find blocks, signals and parameters with a path matching a regular expression'''
+        regex = re.compile(regex)
+        return [self._proxy(code) for path, code in self._paths() if regex.search(path)]
+        
+    def signalGroup(self, pattern):
+        '''
+        Create a SignalGroup of the signals matching a glob pattern, or of a 
+        list of signal paths
+        '''
+        if isinstance(pattern, str):
+            signals = [item for item in self.find(pattern) if isinstance(item, XpcSignal)]
+        else:
+            signals = [self[path] for path in pattern]
+        
+        return SignalGroup(self._xpc, signals)
+    
     def __repr__(self):
         return '<xpcmodel>'
         
@@ -198,42 +978,289 @@ def defaultDllPath():
         return os.path.join(os.path.dirname(__file__), 'xpcapi.dll')    
 
 
-class XpcFile:
-    def __init__(self, xpc, filename, mode):
+_privateDlls = itertools.count()
+_dllDirectories = set()
+
+def privateDllCopy(dllpath):
+    '''
+    Copy dllpath to a new file in a directory of this process under the temp
+    directory, and return its path
+    
+    Windows loads a dll only once per path, so loading a private copy gives
+    a connection its own instance of the dll state, in particular its own
+    xPCGetLastError. The copies left by earlier processes are removed when
+    the first copy is made (files still in use are skipped).
+    '''
+    base = os.path.join(tempfile.gettempdir(), 'xpcapi-dll')
+    folder = os.path.join(base, str(os.getpid()))
+    n = next(_privateDlls)
+    
+    if n == 0:
+        if os.path.isdir(base):
+            for name in os.listdir(base):
+                if name != str(os.getpid()):
+                    shutil.rmtree(os.path.join(base, name), ignore_errors = True)
+    os.makedirs(folder, exist_ok = True)
+    
+    # Dependencies of the dll are still found next to the original
+    dlldir = os.path.dirname(os.path.abspath(dllpath))
+    if dlldir not in _dllDirectories and hasattr(os, 'add_dll_directory'):
+        _dllDirectories.add(dlldir)
+        os.add_dll_directory(dlldir)
+    
+    root, ext = os.path.splitext(os.path.basename(dllpath))
+    copy = os.path.join(folder, '%s-%d%s' % (root, n, ext))
+    shutil.copyfile(dllpath, copy)
+    return copy
+
+
+# bytes: size of the transfer, seconds: duration of the fSReadFile/fSWriteFile call
+Transfer = namedtuple('Transfer', 'bytes, seconds')
+
+
+class XpcFile(io.RawIOBase):
+    '''
+    A file on the target file system, as an unbuffered binary file
+    
+    mode is 'r' (read), 'w' (write, truncating the file) or 'a' (append).
+    
+    Reads are transferred with fSReadFile straight into the caller's buffer,
+    writes with fSWriteFile, in transfers of at most chunkSize bytes. Wrap an
+    XpcFile in io.BufferedReader/BufferedWriter (see XpcApi.openFile) to
+    coalesce small reads and writes into large transfers.
+    
+    Writes are sequential: a file opened for writing is not seekable.
+    
+    lastTransfer, bytesTransferred and transferTime report the throughput of
+    the transfers; onTransfer, if set, is called with a Transfer after every
+    transfer.
+    '''
+    chunkSize = 65536
+    
+    def __init__(self, xpc, filename, mode = 'r', chunkSize = None, onTransfer = None):
+        if mode not in ('r', 'w', 'a'):
+            raise ValueError('invalid mode %r' % mode)
+        
+        super().__init__()
         self._xpc = xpc
+        self.name = filename
+        self.mode = mode
+        if chunkSize is not None:
+            self.chunkSize = chunkSize
+        self.onTransfer = onTransfer
+        self.lastTransfer = None
+        self.bytesTransferred = 0
+        self.transferTime = 0.0
+        
         self._handle = xpc.fSOpenFile(filename, mode)
-        self._pos = 0
         self._size = xpc.fSGetFileSize(self._handle)
-        
-    def read(self, nbytes = None):
-        if self._handle is None:
-            raise RuntimeError('read on closed file')
-            
-        if nbytes is None:
-            nbytes = self._size - self._pos
+        self._pos = self._size if mode == 'a' else 0
+    
+    @property
+    def throughput(self):
+        '''Average throughput of all transfers, in bytes/s'''
+        return self.bytesTransferred / self.transferTime if self.transferTime else None
+    
+    def _transferred(self, nbytes, start):
+        transfer = Transfer(nbytes, time.perf_counter() - start)
+        self.lastTransfer = transfer
+        self.bytesTransferred += transfer.bytes
+        self.transferTime += transfer.seconds
+        if self.onTransfer is not None:
+            self.onTransfer(transfer)
+    
+    def readable(self):
+        return self.mode == 'r'
+    
+    def writable(self):
+        return self.mode != 'r'
+    
+    def seekable(self):
+        return self.mode == 'r'
+    
+    def tell(self):
+        self._checkClosed()
+        return self._pos
+    
+    def seek(self, offset, whence = io.SEEK_SET):
+        self._checkClosed()
+        if not self.seekable():
+            raise io.UnsupportedOperation('seek')
+        if whence == io.SEEK_SET:
+            pos = offset
+        elif whence == io.SEEK_CUR:
+            pos = self._pos + offset
+        elif whence == io.SEEK_END:
+            pos = self._size + offset
         else:
-            nbytes = min(nbytes, self._size - self._pos)
+            raise ValueError('invalid whence (%r)' % whence)
         
-        if nbytes == 0:
-            return b''
-            
-        buffer = ctypes.create_string_buffer(nbytes)
-        
-        self._xpc.fSReadFile(self._handle, self._pos, nbytes,
-                             ctypes.cast(buffer, ctypes.POINTER(ctypes.c_ubyte )))
-        
-        self._pos += nbytes
-        
-        return buffer.raw
+        if pos < 0:
+            raise ValueError('negative seek position %d' % pos)
+        self._pos = pos
+        return pos
+    
+    def readinto(self, b):
+        self._checkClosed()
+        if not self.readable():
+            raise io.UnsupportedOperation('read')
+        view = memoryview(b).cast('B')
+        nbytes = max(0, min(len(view), self._size - self._pos))
+        
+        offset = 0
+        while offset < nbytes:
+            count = min(self.chunkSize, nbytes - offset)
+            buffer = (ctypes.c_ubyte * count).from_buffer(view[offset:offset + count])
+            start = time.perf_counter()
+            self._xpc.fSReadFile(self._handle, self._pos, count, buffer)
+            self._transferred(count, start)
+            self._pos += count
+            offset += count
+        
+        return nbytes
+    
+    def write(self, b):
+        self._checkClosed()
+        if not self.writable():
+            raise io.UnsupportedOperation('write')
+        view = memoryview(b).cast('B')
+        
+        offset = 0
+        while offset < len(view):
+            count = min(self.chunkSize, len(view) - offset)
+            chunk = view[offset:offset + count]
+            # Read-only buffers (e.g. bytes) have to be copied for ctypes
+            if chunk.readonly:
+                buffer = (ctypes.c_ubyte * count).from_buffer_copy(chunk)
+            else:
+                buffer = (ctypes.c_ubyte * count).from_buffer(chunk)
+            start = time.perf_counter()
+            self._xpc.fSWriteFile(self._handle, count, buffer)
+            self._transferred(count, start)
+            offset += count
+        
+        self._pos += len(view)
+        self._size = max(self._size, self._pos)
+        return len(view)
+    
+    def readall(self):
+        buffer = bytearray(max(0, self._size - self._pos))
+        self.readinto(buffer)
+        return bytes(buffer)
     
     def close(self):
-        if self._handle is not None:
-            self._xpc.fSCloseFile(self._handle)
-        self._handle = None
+        if not self.closed:
+            try:
+                self._xpc.fSCloseFile(self._handle)
+            finally:
+                self._handle = None
+                super().close()
+    
+
+WaitResult = namedtuple('WaitResult', 'finished, polls, elapsed')
+
+
+class ScopeConfig(namedtuple('ScopeConfig', 
+        'type, signals, numSamples, decimation, triggerMode, numPrePostSamples, '
+        'triggerSignal, triggerScope, triggerScopeSample, triggerLevel, triggerSlope')):
+    '''
+    The complete configuration of a scope, as transferred by getScope and
+    setScope in a single call. signals is a tuple of at most 20 signal indices.
+    
+    Use _replace to derive a modified configuration:
+    
+        config = scope.getConfig()
+        scope.setConfig(config._replace(numSamples = 1000, decimation = 2))
+    '''
+    __slots__ = ()
     
-    def __del__(self):
-        self.close()
+    # Number of signal slots in scopedata (not the xPC MAX_SIGNALS constant)
+    MAX_SCOPE_SIGNALS = len(scopedata().signals)
+    
+    @classmethod
+    def fromStruct(cls, data):
+        return cls(
+            SCTYPE(data.type),
+            tuple(itertools.takewhile(lambda x: x>=0, data.signals)),
+            data.numsamples,
+            data.decimation,
+            TRIGMD(data.triggermode),
+            data.numprepostsamples,
+            data.triggersignal,
+            data.triggerscope,
+            data.triggerscopesample,
+            data.triggerlevel,
+            TRIGSLOPE(data.triggerslope)
+            )
         
+    @classmethod
+    def read(cls, scope):
+        return scope.getConfig()
+    
+    def apply(self, scope, diff = False):
+        return scope.setConfig(self, diff)
+    
+    def toStruct(self, number):
+        signals = [int(signal) for signal in self.signals]
+        if len(signals) > self.MAX_SCOPE_SIGNALS:
+            raise ValueError('a scope can have at most %d signals' % self.MAX_SCOPE_SIGNALS)
+        
+        data = scopedata()
+        data.number = int(number)
+        data.type = self.type
+        data.signals[:] = signals + [-1] * (self.MAX_SCOPE_SIGNALS - len(signals))
+        data.numsamples = self.numSamples
+        data.decimation = self.decimation
+        data.triggermode = self.triggerMode
+        data.numprepostsamples = self.numPrePostSamples
+        data.triggersignal = int(self.triggerSignal)
+        data.triggerscope = int(self.triggerScope)
+        data.triggerscopesample = self.triggerScopeSample
+        data.triggerlevel = self.triggerLevel
+        data.triggerslope = self.triggerSlope
+        return data
+    
+    def diff(self, other):
+        '''Returns a dict {field: (value in self, value in other)} of the fields that differ'''
+        return {field: (a, b) for field, a, b in zip(self._fields, self, other) if a != b}
+
+
+def _waitFinished(scopes, timeout, minInterval, maxInterval, expectedEnd = None):
+    '''
+    Wait until all scopes are finished: sleep until the expected end of the
+    acquisitions (expectedEnd, a time.monotonic() value, or estimated from
+    the scopes), then poll with exponential backoff
+    '''
+    t0 = time.monotonic()
+    deadline = float('inf') if timeout is None else t0 + timeout
+    
+    # Only sleep for scopes whose start time is known, the others may have
+    # finished long ago
+    if expectedEnd is not None:
+        expected = [expectedEnd]
+    else:
+        expected = [end for end in (scope._expectedEnd() for scope in scopes) if end is not None]
+    if expected:
+        expected = max(expected)
+        # Wake up a little early, the estimate does not include communication delays
+        wakeup = min(expected - 0.1 * (expected - t0), deadline)
+        if wakeup > t0:
+            time.sleep(wakeup - t0)
+    
+    polls = 0
+    interval = minInterval
+    pending = list(scopes)
+    while True:
+        polls += len(pending)
+        pending = [scope for scope in pending if not scope.isFinished()]
+        
+        now = time.monotonic()
+        if not pending or now >= deadline:
+            return WaitResult(not pending, polls, now - t0)
+        
+        time.sleep(min(interval, deadline - now))
+        interval = min(interval * 2, maxInterval)
+
 
 class XpcScope:
     # Scope related enums
@@ -241,6 +1268,11 @@ class XpcScope:
     def __init__(self, xpc, id):
         self._xpc = xpc
         self._id = id
+        self._startedAt = None
+        # Locally known state, None if unknown
+        self._config = None # Last known ScopeConfig
+        self._type = None
+        self._signals = None
     def __int__(self):
         return self._id
     
@@ -249,6 +1281,33 @@ class XpcScope:
     
     def start(self):
         self._xpc.scStart(self._id)
+        self._startedAt = time.monotonic()
+    
+    def _expectedEnd(self):
+        '''
+        Estimate when the acquisition will be finished, assuming it was
+        triggered when it was started. None if it was not started by this object.
+        '''
+        if self._startedAt is None:
+            return None
+        
+        numSamples = self.getNumSamples() + max(self.getNumPrePostSamples(), 0)
+        duration = numSamples * self.getDecimation() * self._xpc.getSampleTime()
+        return self._startedAt + duration
+    
+    def wait(self, timeout = None, minInterval = 0.001, maxInterval = 0.1):
+        '''
+        Wait until the scope is finished, or timeout seconds have passed
+        
+        Instead of polling continuously, this sleeps until the expected end of
+        the acquisition (based on the number of samples, pre/post-trigger
+        samples, decimation and sample time), and then polls isFinished with
+        an interval that doubles from minInterval up to maxInterval. If the
+        scope was not started by this object, polling starts right away.
+        
+        Returns a WaitResult(finished, polls, elapsed)
+        '''
+        return _waitFinished([self], timeout, minInterval, maxInterval)
         
     def stop(self):
         self._xpc.scStop(self._id)
@@ -270,37 +1329,141 @@ class XpcScope:
     
     def setDecimation(self, decimation):
         self._xpc.scSetDecimation(self._id, decimation)
+        self._config = None
         
     def getNumSamples(self):
         return self._xpc.scGetNumSamples(self._id)
     
     def setNumSamples(self, numSamples):
         self._xpc.scSetNumSamples(self._id, numSamples)
+        self._config = None
+    
+    def getConfig(self):
+        '''Get the complete configuration as ScopeConfig, in a single call'''
+        self._config = ScopeConfig.fromStruct(self._xpc.getScope(self._id))
+        self._type = self._config.type
+        self._signals = list(self._config.signals)
+        return self._config
+    
+    def setConfig(self, config, diff = False):
+        '''
+        Apply a ScopeConfig in a single call
+        
+        With diff, the configuration is only written if it differs from the
+        last configuration read or written through this object (which is
+        read first if unknown); configuration changes made through other
+        XpcScope objects or other clients are not noticed. Returns whether the
+        configuration was written.
+        '''
+        if diff:
+            current = self._config if self._config is not None else self.getConfig()
+            if current == config:
+                return False
+        
+        self._xpc.setScope(config.toStruct(self._id))
+        self._config = config
+        self._type = SCTYPE(config.type)
+        self._signals = [int(signal) for signal in config.signals]
+        return True
+        
+    def _forget(self):
+        '''Forget the locally known state'''
+        self._config = None
+        self._type = None
+        self._signals = None
+    
+    def _signalIds(self):
+        if self._signals is None:
+            self.getConfig()
+        return list(self._signals)
     
     def getSignals(self):
         '''
         Get a list of XpcSignals for this scope
         '''
-        # TODO: use scGetSignals instead
-        scdata = self._xpc.getScope(self._id)
-        sigIds = itertools.takewhile(lambda x: x>=0, scdata.signals)
+        return [self._xpc.scopes._signal(id) for id in self._signalIds()]
+    
+    def _dataArgs(self, signals, numSamples):
+        if signals is None:
+            signals = self._signalIds()
+        else:
+            signals = [int(signal) for signal in signals]
+        if numSamples is None:
+            numSamples = self.getNumSamples()
+        return signals, numSamples
+    
+    def _getColumns(self, signals, start, numSamples, decimation, out):
+        for column, signal in enumerate(signals):
+            self._xpc.scGetData(self._id, signal, start, numSamples, decimation,
+                                out[:, column].ctypes.data_as(ctypes.POINTER(ctypes.c_double)))
+    
+    def getData(self, signals = None, start = 0, numSamples = None, decimation = 1, out = None):
+        '''
+        Get the acquired data of this scope, as a (samples, signals) NumPy array
+        
+        signals is a list of signal indices or XpcSignals (default: all signals
+        of the scope), numSamples defaults to the number of samples of the
+        scope. With decimation > 1, only every decimation-th sample is
+        transferred.
         
-        return [XpcSignal(self._xpc, self._xpc.getSignalName(id), id) for id in sigIds]
+        The data is transferred directly into the result array, one call per
+        signal. To reuse an array, pass it as out; it must be a Fortran-ordered
+        (column-major) float64 array of the right shape.
+        '''
+        signals, numSamples = self._dataArgs(signals, numSamples)
+        shape = (-(-numSamples // decimation), len(signals))
+        
+        if out is None:
+            out = np.empty(shape, dtype = np.float64, order = 'F')
+        elif out.shape != shape or out.dtype != np.float64 or not out.flags.f_contiguous:
+            raise ValueError('out should be a Fortran-ordered float64 array of shape %s' % (shape,))
+        
+        self._getColumns(signals, start, numSamples, decimation, out)
+        return out
+    
+    def iterData(self, chunk = 4096, signals = None, start = 0, numSamples = None, decimation = 1):
+        '''
+        Get the acquired data of this scope in chunks of at most chunk
+        (decimated) samples, see getData
+        
+        Yields (samples, signals) arrays. All chunks are views on the same
+        buffer, so a chunk is only valid until the next one is fetched.
+        '''
+        signals, numSamples = self._dataArgs(signals, numSamples)
+        buffer = np.empty((chunk, len(signals)), dtype = np.float64, order = 'F')
+        
+        end = start + numSamples
+        while start < end:
+            count = min(chunk * decimation, end - start)
+            rows = -(-count // decimation)
+            
+            self._getColumns(signals, start, count, decimation, buffer[:rows])
+            yield buffer[:rows]
+            
+            start += count
     
     def addSignal(self, signal):
         '''
         Add a signal to a scope, can be either a signal index or an XpcSignal
         '''
-        self._xpc.scAddSignal(self._id, int(signal))   
+        self._xpc.scAddSignal(self._id, int(signal))
+        self._config = None
+        if self._signals is not None:
+            self._signals.append(int(signal))
     
     def removeSignal(self, signal):
         '''
         Remove a signal from a scope, can be either a signal index or an XpcSignal
         '''
         self._xpc.scRemSignal(self._id, int(signal))
+        self._config = None
+        if self._signals is not None and int(signal) in self._signals:
+            self._signals.remove(int(signal))
             
     def getType(self):
-        return SCTYPE(self._xpc.scGetType(self._id))
+        if self._type is None:
+            self._type = SCTYPE(self._xpc.scGetType(self._id))
+        return self._type
         
     def getState(self):
         return SCST(self._xpc.scGetState(self._id))
@@ -311,32 +1474,35 @@ class XpcScope:
     def setTriggerMode(self, mode):
         '''Set trigger mode (a TRIGMD value)'''
         self._xpc.scSetTriggerMode(self._id, mode)
+        self._config = None
 
     def getTriggerScope(self):
         '''
         Returns the triggering scope (trigger source) for this scope
-        Note that a new XpcScope object is returned
         '''
-        return XpcScope(self, self._xpc.scGetTriggerScope(self._id))
+        return self._xpc.scopes.get(self._xpc.scGetTriggerScope(self._id))
     
     def setTriggerScope(self, scope):
         self._xpc.scSetTriggerScope(self._id, int(scope))
+        self._config = None
 
     def getTriggerScopeSample(self):
         return self._xpc.scGetTriggerScopeSample(self._id)
     
     def setTriggerScopeSample(self, triggerScopeSample):
         self._xpc.scSetTriggerScopeSample(self._id, triggerScopeSample)
+        self._config = None
 
     def getTriggerSignal(self):
         id = self._xpc.scGetTriggerSignal(self._id)
         if id == -1:
             return None
         else:
-            return XpcSignal(self._xpc, self._xpc.getSignalName(id), id)
+            return self._xpc.scopes._signal(id)
     
     def setTriggerSignal(self, signal):
         self._xpc.scSetTriggerSignal(self._id, int(signal))
+        self._config = None
 
     def getTriggerSlope(self):
         return TRIGSLOPE(self._xpc.scGetTriggerSlope(self._id))
@@ -344,12 +1510,14 @@ class XpcScope:
     def setTriggerSlope(self, slope):
         '''Set trigger slope (a TRIGSLOPE value)'''
         self._xpc.scSetTriggerSlope(self._id, slope)
+        self._config = None
         
     def getTriggerLevel(self):
         return self._xpc.scGetTriggerLevel(self._id)
     
     def setTriggerLevel(self, level):
         self._xpc.scSetTriggerLevel(self._id, level)
+        self._config = None
     
     def softwareTrigger(self):
         self._xpc.scSoftwareTrigger(self._id)
@@ -359,6 +1527,7 @@ class XpcScope:
 
     def setNumPrePostSamples(self, numSamples):
         self._xpc.scSetNumPrePostSamples(self._id, numSamples)
+        self._config = None
 
     # File scope specific
     def setFilename(self, filename):
@@ -378,31 +1547,569 @@ class XpcScope:
         return SCMODE(self._xpc.tgScGetMode(self._id))
 
 
+class ScopeRegistry:
+    '''
+    The scopes on the target, as known locally
+    
+    The registry keeps one XpcScope object per scope id, which also tracks the
+    type and signals of the scope. The list of scopes is queried from the
+    target once, and then updated locally when scopes are added or removed
+    through XpcApi. Call sync() to resynchronize with the target, e.g. after
+    scopes were changed by another client.
+    
+    XpcApi clears the registry when an application is loaded or unloaded and
+    when the port is closed.
+    '''
+    def __init__(self, xpc):
+        self._xpc = xpc
+        self.clear()
+        
+    def clear(self):
+        self._scopes = None
+        self._signalNames = {}
+    
+    def sync(self):
+        '''Query the scopes from the target, forgetting all locally known state'''
+        ids = (ctypes.c_int * (MAX_SCOPES+1))()
+        _xpcapi.getScopes(self._xpc, ids)
+        
+        # ids is a -1 terminated list. Keep existing XpcScope objects.
+        old = self._scopes or {}
+        self._scopes = {}
+        for id in itertools.takewhile(lambda x: x>=0, ids):
+            scope = self._scopes[id] = old.get(id) or XpcScope(self._xpc, id)
+            scope._forget()
+        self._signalNames = {}
+    
+    def all(self, refresh = False):
+        '''Returns a dict {id: XpcScope}'''
+        if refresh or self._scopes is None:
+            self.sync()
+        return dict(self._scopes)
+    
+    def get(self, id):
+        '''Returns the XpcScope for a scope id'''
+        if self._scopes is None:
+            self.sync()
+        try:
+            return self._scopes[id]
+        except KeyError:
+            # Not known (yet), e.g. added by another client
+            scope = self._scopes[id] = XpcScope(self._xpc, id)
+            return scope
+    
+    def add(self, type, id = None):
+        '''Add a scope to the target, with the first free id if id is None'''
+        if self._scopes is None:
+            self.sync()
+        if id is None:
+            id = max(self._scopes.keys(), default = 0) + 1
+        
+        _xpcapi.addScope(self._xpc, type, id)
+        
+        scope = self._scopes[id] = XpcScope(self._xpc, id)
+        scope._type = SCTYPE(type)
+        scope._signals = []
+        return scope
+    
+    def _removed(self, id):
+        if self._scopes is not None:
+            self._scopes.pop(id, None)
+            
+    def _signal(self, id):
+        '''An XpcSignal for a signal index, with the signal name cached'''
+        try:
+            name = self._signalNames[id]
+        except KeyError:
+            name = self._signalNames[id] = self._xpc.getSignalName(id)
+        return XpcSignal(self._xpc, name, id)
+        
+    def __iter__(self):
+        return iter(self.all().values())
+    
+    def __len__(self):
+        return len(self.all())
+
+
 FileInfo = namedtuple('FileInfo', 'name, size, isdir, datetime')        
+
+ParamInfo = namedtuple('ParamInfo', 'index, block, name, dims, type')
+
+ParamChange = namedtuple('ParamChange', 'index, old, new')
+
+
+class ParamCache:
+    '''
+    Cache of parameter metadata (dims, type, block and parameter names and
+    name -> index lookups) of the loaded application
+    
+    Entries are fetched from the target on first use, or all at once with
+    load(). XpcApi clears the cache when an application is loaded or unloaded
+    and when the port is closed; refresh() clears it explicitly.
+    
+    The cache also keeps a shadow copy of the last value read from or written
+    to each parameter, which transaction() uses to skip unchanged writes.
+    '''
+    def __init__(self, xpc):
+        self._xpc = xpc
+        self.refresh()
+    
+    def refresh(self):
+        '''Forget all cached metadata'''
+        self._dims = {}
+        self._names = {}
+        self._types = {}
+        self._indices = {}
+        self._complete = False
+        self._shadow = {}
+    
+    def clearShadow(self):
+        '''Forget the shadow copies of the parameter values'''
+        self._shadow = {}
+    
+    def shadow(self, parIdx):
+        '''The last known value of a parameter as 2-D array (do not modify), or None'''
+        return self._shadow.get(parIdx)
+    
+    def _setShadow(self, parIdx, values):
+        if values is None:
+            self._shadow.pop(parIdx, None)
+        else:
+            self._shadow[parIdx] = np.array(values, dtype = np.float64)
+    
+    def transaction(self, readback = False):
+        '''
+        Start a ParamTransaction, to be used as context manager:
+        
+            with api.params.transaction() as tx:
+                tx['Controller/PID/P'] = 1.5
+                tx[model.Controller.PID.I] = 0.1
+            print(tx.changed)
+        
+        With readback, parameters without a shadow copy are read before writing,
+        so that unchanged values are not written.
+        '''
+        return ParamTransaction(self._xpc, readback)
+    
+    def dims(self, parIdx):
+        try:
+            return self._dims[parIdx]
+        except KeyError:
+            dims = self._dims[parIdx] = tuple(self._xpc.getParamDims(parIdx))
+            return dims
+    
+    def name(self, parIdx):
+        '''Returns (block, parameter name) of a parameter'''
+        try:
+            return self._names[parIdx]
+        except KeyError:
+            name = self._names[parIdx] = self._xpc.getParamName(parIdx)
+            self._indices[name] = parIdx
+            return name
+    
+    def type(self, parIdx):
+        try:
+            return self._types[parIdx]
+        except KeyError:
+            type = self._types[parIdx] = self._xpc.getParamType(parIdx)
+            return type
+        
+    def index(self, block, param):
+        '''Returns the index of a parameter, or -1 if it does not exist'''
+        try:
+            return self._indices[block, param]
+        except KeyError:
+            if self._complete:
+                return -1
+            
+        index = self._xpc.getParamIdx(block, param)
+        if index >= 0:
+            self._indices[block, param] = index
+        return index
+    
+    def preload(self, tables):
+        '''Fill the cache from ModelTables'''
+        self.refresh()
+        
+        for i, name in enumerate(zip(tables.paramBlocks, tables.paramNames)):
+            self._names[i] = name
+            self._indices[name] = i
+        if tables.paramDims is not None:
+            self._dims.update(enumerate(tables.paramDims))
+        if tables.paramTypes is not None:
+            self._types.update(enumerate(tables.paramTypes))
+        
+        self._complete = tables.paramDims is not None and tables.paramTypes is not None
+        self._shadow = {}
+        
+    def info(self, parIdx):
+        block, name = self.name(parIdx)
+        return ParamInfo(parIdx, block, name, self.dims(parIdx), self.type(parIdx))
+    
+    def load(self):
+        '''Fetch the metadata of all parameters'''
+        if not self._complete:
+            for i in range(self._xpc.getNumParams()):
+                self.info(i)
+            self._complete = True
+    
+    def __iter__(self):
+        self.load()
+        return (self.info(i) for i in range(len(self._names)))
+    
+    def __len__(self):
+        self.load()
+        return len(self._names)
         
-class XpcApi(_xpcapi):
 
-    def __init__(self, dllpath = None):
+class ParamTransaction:
+    '''
+    A set of parameter writes that is applied at once
+    
+    Writes are collected with set() (or item assignment) and applied when the
+    transaction is committed, which happens when the with block ends without an
+    exception. Writes that do not change the shadow copy of the parameter
+    value are skipped. The remaining ones are written one call each, with a
+    single error check after the last write.
+    
+    After committing, changed is a list of ParamChanges (index, old value or
+    None if unknown, new value), and skipped a list of unchanged parameter
+    indices.
+    
+    Parameters can be given as index, XpcParam, 'block path/name' or
+    (block path, name) tuple.
+    '''
+    def __init__(self, xpc, readback = False):
+        self._xpc = xpc
+        self._readback = readback
+        self._writes = {}
+        self.changed = []
+        self.skipped = []
+        
+    def _resolve(self, param):
+        if isinstance(param, XpcParam):
+            return param._index
+        if isinstance(param, str):
+            param = param.rpartition('/')[::2]
+        if isinstance(param, tuple):
+            parIdx = self._xpc.params.index(*param)
+            if parIdx < 0:
+                raise KeyError(param)
+            return parIdx
+        return int(param)
+    
+    def set(self, param, value, index = None):
+        '''
+        Set (the elements given by index of) a parameter, see XpcApi.setParam
+        
+        For a partial write, the parameter is only read if it has no pending
+        write or shadow copy.
+        '''
+        parIdx = self._resolve(param)
+        
+        if index is None:
+            values = self._xpc._paramArray(parIdx, value)
+        else:
+            values = self._writes.get(parIdx)
+            if values is None:
+                values = self._xpc.params.shadow(parIdx)
+            if values is None:
+                values = self._xpc._getParamValues(parIdx, *self._xpc.params.dims(parIdx))
+            values = values.copy()
+            values[index] = value
+        
+        self._writes[parIdx] = values
+    
+    __setitem__ = set
+    
+    def commit(self):
+        '''Apply the writes, returns the list of changes'''
+        writes, self._writes = self._writes, {}
+        cache = self._xpc.params
+        
+        if self._readback:
+            for parIdx in writes:
+                if cache.shadow(parIdx) is None:
+                    self._xpc._getParamValues(parIdx, *cache.dims(parIdx))
+        
+        self.changed = []
+        self.skipped = []
+        for parIdx, values in writes.items():
+            old = cache.shadow(parIdx)
+            if old is not None and np.array_equal(old, values):
+                self.skipped.append(parIdx)
+            else:
+                self.changed.append(ParamChange(parIdx, old, values))
         
+        self._xpc._setParams([(change.index, change.new) for change in self.changed])
+        return self.changed
+    
+    def discard(self):
+        self._writes = {}
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.commit()
+        else:
+            self.discard()
+            
+        
+class XpcApi(_xpcapi):
+    # Build the model from the XML description of the target when available
+    modelFromXML = True
+
+    # Default buffer size of files opened for writing with openFile
+    writeBufferSize = 1 << 20
+
+    # Reconnection of a resilient XpcApi: number of attempts and the delay
+    # before the first retry, which doubles up to reconnectMaxDelay
+    reconnectAttempts = 5
+    reconnectDelay = 0.5
+    reconnectMaxDelay = 10.0
+
+    def __init__(self, dllpath = None, lazyModel = False, modelCache = None, compactModel = False,
+                 lock = None, resilient = False, privateDll = True):
+        '''
+        Load the xPC API dll (from dllpath, or defaultDllPath() if omitted)
+        
+        lazyModel selects a lazy XpcModel, compactModel a CompactModel (which
+        takes precedence). modelCache enables the on-disk cache of the model
+        metadata: pass a directory, or True for defaultCacheDir().
+        
+        With privateDll, every XpcApi loads its own copy of the dll (see
+        privateDllCopy), so connections do not share the error state of the
+        dll. All dll calls are made while holding lock, by default a lock of
+        this XpcApi: an XpcApi can be used from several threads, calls on
+        different connections run in parallel, and errors are reported on the
+        connection that caused them. Without privateDll, all connections use
+        the same dll and the default lock is GLOBAL_LOCK, see _xpcapi.
+        
+        With resilient, a call that fails because the target does not respond
+        any more raises XpcConnectionError and makes the XpcApi reconnect on a
+        background thread (with reOpenPort, or by opening the port again),
+        without blocking other connections. The model and parameter
+        metadata are kept if the same application is running after
+        reconnecting. See also startKeepAlive.
+        '''
         if dllpath is None:
             dllpath = defaultDllPath()
 
-        lib = ctypes.windll.LoadLibrary(dllpath)
-        
+        if privateDll:
+            lib = ctypes.windll.LoadLibrary(privateDllCopy(dllpath))
+            if lock is None:
+                lock = threading.RLock()
+        else:
+            lib = ctypes.windll.LoadLibrary(dllpath)
         
-        super().__init__(lib)
+        super().__init__(lib, lock)
         self._port = None
         self._model = None
+        self._params = ParamCache(self)
+        self._scopes = ScopeRegistry(self)
+        self._appHash = None
+        self.lazyModel = lazyModel
+        self.compactModel = compactModel
+        self.resilient = resilient
+        self.alive = None
+        self._address = None
+        self._appName = None
+        self._reconnectLock = threading.Lock()
+        self._lastCall = time.monotonic()
+        self._keepAlive = None
+        
+        if modelCache is True:
+            modelCache = defaultCacheDir()
+        self._modelCache = ModelCache(modelCache) if modelCache else None
 
     @property
     def model(self):
         if self._model is None:
-            self._model = XpcModel(self)
+            self._model = self._loadModel()
         return self._model
+    
+    def _loadModel(self):
+        tables = None
+        
+        if self._modelCache is not None:
+            key = self._modelCache.key(self, self._appHash)
+            tables = self._modelCache.load(key)
+        
+        if tables is None and (self.compactModel or not self.lazyModel):
+            if self.modelFromXML:
+                tables = fetchModelTablesXML(self)
+            
+            if tables is None and (self.compactModel or self._modelCache is not None):
+                tables = fetchModelTables(self, paramInfo = self._modelCache is not None)
+                
+            if tables is not None and self._modelCache is not None:
+                self._modelCache.save(key, tables)
+        
+        if tables is None:
+            # Enumerate the signals and parameters one by one
+            return XpcModel(self, self.lazyModel)
+        
+        self._params.preload(tables)
+        if self.compactModel:
+            return CompactModel(self, tables)
+        return XpcModel(self, tables = tables)
+    
+    @property
+    def params(self):
+        '''ParamCache with the parameter metadata of the loaded application'''
+        return self._params
         
         
     def openTcpIpPort(self, address,port):
         self._port = _xpcapi.openTcpIpPort(self, address,port)
+        self._address = (address, port)
+        self.alive = True
+        self._rememberApp()
+    
+    def _rememberApp(self):
+        self._appName = self.getAppName() if self.resilient else None
+    
+    def _checkerror(self):
+        self._lastCall = time.monotonic()
+        try:
+            super()._checkerror()
+        except XpcError as e:
+            if not self.resilient or self._address is None:
+                raise
+            if self._reconnectLock.locked():
+                raise XpcConnectionError('reconnecting to %s (%s)' % (self._address[0], e)) from e
+            if self._ping() or not self._reconnectLock.acquire(blocking = False):
+                raise
+            
+            # Reconnect once this call has released the lock
+            threading.Thread(target = self._reconnectInBackground, daemon = True,
+                             name = 'xpcapi-reconnect').start()
+            raise XpcConnectionError('connection to %s was lost, reconnecting (%s)' 
+                                     % (self._address[0], e)) from e
+    
+    def _ping(self):
+        '''Ping the target, without raising on errors'''
+        with self._lock:
+            alive = bool(self._lib.xPCTargetPing(self._port)) and self._lib.xPCGetLastError() == 0
+            self._lib.xPCSetLastError(0)
+        self.alive = alive
+        return alive
+    
+    def reconnect(self):
+        '''
+        Restore the connection to the target, first with reOpenPort, then by
+        opening the port again, with increasing delays between the attempts
+        (see reconnectAttempts). Raises XpcConnectionError if that fails.
+        
+        The cached model and parameter metadata are kept if the target runs
+        the same application as before, otherwise they are discarded.
+        
+        The lock is only held during each attempt, so other threads can use
+        other connections (and get XpcConnectionError on this one) meanwhile.
+        If a reconnect is already running, this waits for its result.
+        '''
+        if self._address is None:
+            raise XpcConnectionError('no port to reconnect')
+        
+        if not self._reconnectLock.acquire(blocking = False):
+            with self._reconnectLock:
+                pass
+            if not self.alive:
+                raise XpcConnectionError('could not reconnect to %s' % self._address[0])
+            return
+        
+        try:
+            self._reconnect()
+        finally:
+            self._reconnectLock.release()
+    
+    def _reconnectInBackground(self):
+        try:
+            self._reconnect()
+        except XpcError:
+            pass
+        finally:
+            self._reconnectLock.release()
+    
+    def _reconnect(self):
+        address = self._address
+        delay = self.reconnectDelay
+        for attempt in range(self.reconnectAttempts):
+            if attempt:
+                time.sleep(delay)
+                delay = min(2 * delay, self.reconnectMaxDelay)
+            with self._lock:
+                if self._address is None:
+                    raise XpcConnectionError('port closed while reconnecting')
+                if self._reopen():
+                    break
+        else:
+            self.alive = False
+            raise XpcConnectionError('could not reconnect to %s' % address[0])
+        
+        with self._lock:
+            appName = self.getAppName()
+            if appName != self._appName:
+                self._appHash = None
+                self._model = None
+                self._params.refresh()
+                self._scopes.clear()
+                self._appName = appName
+            else:
+                # Parameter values are reset if the target was rebooted
+                self._params.clearShadow()
+                self._scopes.sync()
+    
+    def _reopen(self):
+        '''One reconnection attempt, returns whether the target responds'''
+        try:
+            self.reOpenPort()
+            if self._ping():
+                return True
+        except XpcError:
+            pass
+        
+        # Close the old port before opening a new one
+        try:
+            _xpcapi.closePort(self)
+        except XpcError:
+            pass
+        try:
+            self._port = _xpcapi.openTcpIpPort(self, *self._address)
+            return self._ping()
+        except XpcError:
+            return False
+    
+    def startKeepAlive(self, interval = 5.0):
+        '''
+        Ping the target every interval seconds while the connection is idle
+        (no calls during the last interval) on a background thread, and
+        reconnect if it does not respond. alive holds the last known state.
+        '''
+        self.stopKeepAlive()
+        stop = threading.Event()
+        
+        def run():
+            while not stop.wait(interval):
+                if time.monotonic() - self._lastCall < interval or self._address is None:
+                    continue
+                if not self._ping():
+                    try:
+                        self.reconnect()
+                    except XpcConnectionError:
+                        pass
+                self._lastCall = time.monotonic()
+        
+        self._keepAlive = stop
+        threading.Thread(target = run, daemon = True, name = 'xpcapi-keepalive').start()
+    
+    def stopKeepAlive(self):
+        if self._keepAlive is not None:
+            self._keepAlive.set()
+            self._keepAlive = None
+    
     def loadApp(self, file):
    
         absfile = os.path.abspath(file)
@@ -418,11 +2125,28 @@ class XpcApi(_xpcapi):
         
         super().loadApp(head, tail)
         self._model = None
+        self._params.refresh()
+        self._scopes.clear()
+        self._appHash = hashFile(absfile) if self._modelCache else None
+        self._rememberApp()
+    
+    def unloadApp(self):
+        super().unloadApp()
+        self._appHash = None
+        self._model = None
+        self._params.refresh()
+        self._scopes.clear()
+        self._rememberApp()
     
     def closePort(self):
+        self.stopKeepAlive()
+        # No reconnecting from here on
+        self._address = None
         super().closePort()
         self._port = None
         self._model = None
+        self._params.refresh()
+        self._scopes.clear()
     
     def getAPIVersion(self):
         return decode(ctypes.cast(super().getAPIVersion(), ctypes.c_char_p).value)
@@ -432,25 +2156,90 @@ class XpcApi(_xpcapi):
         super().getAppName(name)
         return decode(name.value)
     
-    def setParam(self, parIdx, value):
-        ny, nx = self.getParamDims(parIdx)
-        
-        if nx!=1 or ny!=1:
-            raise NotImplementedError
-        values = (ctypes.c_double * 1)(value)
+    def setParam(self, parIdx, value, index = None):
+        '''
+        Set a parameter. value can be a scalar or, for vector and matrix
+        parameters, an array of the shape given by getParamDims (a 1-D array is
+        accepted for vector parameters).
+        
+        If index is given, only the indexed elements of the parameter are
+        changed (e.g. index = (0, slice(None)) for the first row). The
+        parameter is read once, updated on the host and written back, so this
+        takes two calls regardless of the number of elements.
+        '''
+        if index is not None:
+            rows, cols = self.params.dims(parIdx)
+            values = self._getParamValues(parIdx, rows, cols)
+            values[index] = value
+        else:
+            values = self._paramArray(parIdx, value)
         
-        super().setParam(parIdx, values)
+        super().setParam(parIdx, self._paramPointer(values))
+        self._params._setShadow(parIdx, values)
         
     def getParam(self, parIdx):
-        ny, nx = self.getParamDims(parIdx)
+        '''
+        Get a parameter. Returns a float for scalar parameters and a 2-D NumPy
+        array of the shape given by getParamDims for vector and matrix parameters
+        '''
+        rows, cols = self.params.dims(parIdx)
         
-        if nx!=1 or ny!=1:
-            raise NotImplementedError
-        values = (ctypes.c_double * 1)()
+        values = self._getParamValues(parIdx, rows, cols)
         
-        super().getParam(parIdx, values)
+        if rows == 1 and cols == 1:
+            return float(values[0, 0])
+        return values
+    
+    def _getParamValues(self, parIdx, rows, cols):
+        values = np.empty(rows * cols, dtype = np.float64)
         
-        return values[0]
+        super().getParam(parIdx, values.ctypes.data_as(ctypes.POINTER(ctypes.c_double)))
+        
+        # xPC stores parameters column-major
+        values = values.reshape((rows, cols), order = 'F')
+        self._params._setShadow(parIdx, values)
+        return values
+    
+    def _paramArray(self, parIdx, value):
+        '''Convert value to an array of the dims of parameter parIdx'''
+        rows, cols = self.params.dims(parIdx)
+        
+        values = np.asarray(value, dtype = np.float64)
+        if values.shape != (rows, cols):
+            if values.ndim > 1 or values.size != rows * cols or min(rows, cols) != 1:
+                raise ValueError('parameter %d has dims %dx%d, got value of shape %s' % 
+                                 (parIdx, rows, cols, values.shape))
+            values = values.reshape((rows, cols))
+        return values
+    
+    @staticmethod
+    def _paramPointer(values):
+        # xPC stores parameters column-major
+        values = np.ascontiguousarray(values.ravel(order = 'F'), dtype = np.float64)
+        return values.ctypes.data_as(ctypes.POINTER(ctypes.c_double))
+    
+    def _setParams(self, params):
+        '''
+        Write a list of (parIdx, values) pairs, checking for errors only once,
+        after the last write
+        '''
+        try:
+            with self._lock:
+                for parIdx, values in params:
+                    self._lib.xPCSetParam(self._port, parIdx, self._paramPointer(values))
+                self._checkerror()
+        except XpcError:
+            # It is unknown which of the writes failed
+            for parIdx, _ in params:
+                self._params._setShadow(parIdx, None)
+            raise
+        
+        for parIdx, values in params:
+            self._params._setShadow(parIdx, values)
+    
+    def loadParamSet(self, paramfile):
+        super().loadParamSet(paramfile)
+        self._params.clearShadow()
         
     def getSignals(self, sigIdxs):
         numSignals = len(sigIdxs)
@@ -461,6 +2250,13 @@ class XpcApi(_xpcapi):
         return values
     def getSignal(self, sigIdx):
         return self.getSignals((sigIdx,))[0]
+    
+    def signalGroup(self, signals):
+        '''
+        Create a SignalGroup for repeatedly reading the given signals (indices,
+        XpcSignals or signal names)
+        '''
+        return SignalGroup(self, signals)
         
     
     def getParamName(self, parIdx):
@@ -469,6 +2265,11 @@ class XpcApi(_xpcapi):
         super().getParamName(parIdx, block, param)
         return decode(block.value), decode(param.value)
         
+    def getParamType(self, parIdx):
+        paramType = ctypes.create_string_buffer(256)
+        super().getParamType(parIdx, paramType)
+        return decode(paramType.value)
+        
     def getSignalName(self, sigIdx):
         sigName = ctypes.create_string_buffer(256)
         super().getSignalName(sigIdx, sigName)
@@ -490,10 +2291,26 @@ class XpcApi(_xpcapi):
         super().getParamDims(parIdx, dims)
         return list(dims)
         
-    def openFile(self, filename, mode):
-        if mode != 'r':
-            raise NotImplementedError('Only file mode "r" is implemented')
-        return XpcFile(self, filename, mode)
+    def openFile(self, filename, mode = 'r', chunkSize = None, buffering = None, onTransfer = None):
+        '''
+        Open a file on the target, see XpcFile
+        
+        With buffering > 0, the file is wrapped in an io.BufferedReader or
+        io.BufferedWriter with a buffer of that size. By default, files opened
+        for reading are unbuffered and files opened for writing ('w' or 'a')
+        are buffered with writeBufferSize, so writes are coalesced into large
+        transfers. Buffered data is written to the target on flush() and
+        close(); use a with statement to make sure the file is closed.
+        '''
+        if buffering is None:
+            buffering = 0 if mode == 'r' else self.writeBufferSize
+        
+        f = XpcFile(self, filename, mode, chunkSize, onTransfer)
+        if buffering > 0:
+            if mode == 'r':
+                return io.BufferedReader(f, buffering)
+            return io.BufferedWriter(f, buffering)
+        return f
         
     def listDir(self, path):
         numItems = self.fSDirStructSize(path)
@@ -514,21 +2331,51 @@ class XpcApi(_xpcapi):
         return dirlist
        
     
-    def getScopes(self):
-        scopes = (ctypes.c_int * (MAX_SCOPES+1))()
-        super().getScopes(scopes)
-        
-        # Scopes is a -1 terminated list, return an XpcScope object for each scope
-        return {
-                id: XpcScope(self, id) for id in 
-                    itertools.takewhile(lambda x: x>=0, scopes)
-                }
+    def syncDir(self, remote, local, chunkSize = 1 << 20):
+        '''
+        Copy the files below the target directory remote to the local
+        directory local, recursively
+        
+        Only new and changed files are transferred: the size and date of the
+        copied files are kept in a manifest (.xpcsync.json) in local. Files
+        are downloaded in chunks of chunkSize bytes and written to disk on a
+        separate thread, while the next chunk is transferred. Returns a
+        SyncResult.
+        '''
+        return syncDir(self, remote, local, chunkSize)
     
-    def addScope(self, type, id = None):
-        if id is None:
-            id = max(self.getScopes().keys(), default = 0) + 1
+    @property
+    def scopes(self):
+        '''ScopeRegistry of the scopes on the target'''
+        return self._scopes
+    
+    def getScopes(self, refresh = False):
+        '''
+        Returns a dict {id: XpcScope} of the scopes on the target. The scopes
+        are only queried from the target the first time or with refresh, see
+        ScopeRegistry.
+        '''
+        return self._scopes.all(refresh)
+    
+    def waitScopes(self, scopes, timeout = None, minInterval = 0.001, maxInterval = 0.1,
+                   expectedEnd = None):
+        '''
+        Wait until all scopes are finished, see XpcScope.wait
         
-        super().addScope(type, id)
+        If the caller knows when the acquisitions will end, it can pass that
+        as expectedEnd (a time.monotonic() value), which saves querying the
+        scope settings.
         
-        return XpcScope(self, id)
+        Returns a WaitResult(finished, polls, elapsed), polls being the total
+        number of isFinished calls.
+        '''
+        return _waitFinished(list(scopes), timeout, minInterval, maxInterval, expectedEnd)
+    
+    def addScope(self, type, id = None):
+        return self._scopes.add(type, id)
+    
+    def remScope(self, scope):
+        '''Remove a scope, can be either a scope id or an XpcScope'''
+        super().remScope(int(scope))
+        self._scopes._removed(int(scope))
     
@@ -0,0 +1,292 @@
+# BSD 3-Clause License
+# 
+# Copyright (c) 2018, DEMCON advanced mechatronics
+# All rights reserved.
+# 
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# 
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+# 
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+# 
+# * Neither the name of the copyright holder nor the names of its
+#   contributors may be used to endorse or promote products derived from
+#   this software without specific prior written permission.
+# 
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+# 
+'''
+Continuous, gap-free scope acquisition
+
+'''
+
+import threading
+from collections import namedtuple
+
+import numpy as np
+
+from ._xpcapi import SCTYPE, TRIGMD
+
+# A buffer of scope data. sequence counts buffers since the start, including
+# buffers that were lost, so a jump in sequence means data was dropped.
+Frame = namedtuple('Frame', 'sequence, startTime, data')
+
+
+class RingBuffer:
+    '''
+    Thread-safe ring of preallocated frames of (samples, signals) data
+    
+    When the ring is full, the oldest frame is dropped when the next slot()
+    is taken, and counted in overflows. Frames returned by get() are views on
+    the ring, they remain valid until capacity - 1 more slots have been taken.
+    '''
+    def __init__(self, capacity, numSamples, numSignals):
+        self.capacity = capacity
+        # Stored as (signals, samples) per frame, so that each frame is a
+        # Fortran-ordered (samples, signals) array
+        self._data = np.empty((capacity, numSignals, numSamples), dtype = np.float64)
+        self._frames = [None] * capacity
+        self._head = 0  # Next frame to get
+        self._count = 0
+        self._cond = threading.Condition()
+        self._closed = False
+        self.overflows = 0
+        
+    def slot(self):
+        '''
+        The array to fill with the next frame before calling put()
+        
+        If the ring is full, the oldest frame is dropped here, so that get()
+        cannot return a frame that is being overwritten.
+        '''
+        with self._cond:
+            if self._count == self.capacity:
+                self._head = (self._head + 1) % self.capacity
+                self._count -= 1
+                self.overflows += 1
+            return self._data[(self._head + self._count) % self.capacity].T
+        
+    def put(self, sequence, startTime):
+        '''Add the frame written to slot()'''
+        with self._cond:
+            pos = (self._head + self._count) % self.capacity
+            self._frames[pos] = Frame(sequence, startTime, self._data[pos].T)
+            self._count += 1
+            self._cond.notify_all()
+            
+    def get(self, timeout = None):
+        '''
+        Get the oldest frame, or None if there is none within timeout or the
+        buffer is closed and empty
+        '''
+        with self._cond:
+            self._cond.wait_for(lambda: self._count > 0 or self._closed, timeout)
+            if self._count == 0:
+                return None
+            frame = self._frames[self._head]
+            self._head = (self._head + 1) % self.capacity
+            self._count -= 1
+            return frame
+    
+    def close(self):
+        '''Wake up all waiting get() calls, no more frames will be put'''
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+    
+    def __len__(self):
+        return self._count
+        
+
+class ScopeAcquisition:
+    '''
+    Gap-free acquisition of signals using two or more scopes that take turns
+    
+    Every scope acquires numSamples samples of the signals, taken every
+    decimation-th sample time. Each scope is
+    triggered by the end of the previous one (TRIGMD.SCEND), the first scope
+    by the end of the last one, so one of the scopes is always acquiring. A
+    background thread downloads each finished scope with scGetData into a
+    RingBuffer and re-arms it, while the other scopes continue. This is
+    gap-free as long as downloading a scope takes less time than numScopes - 1
+    acquisitions.
+    
+    Frames are numbered with a sequence number. When a gap is detected from
+    the scope start times, the sequence number skips the lost frames and
+    dropped is incremented.
+    
+    A scope that is re-armed too late misses its trigger, which stops the
+    chain. If no scope finishes within about twice the acquisition time of a
+    scope, all scopes are re-armed and the next one is triggered again; the
+    frames lost in between are counted in dropped, and restarts is
+    incremented.
+    
+    Usage:
+    
+        with ScopeAcquisition(api, signals, 1000) as acq:
+            for frame in acq.frames():
+                ...
+    
+    The scopes are removed again by close() (or at the end of the with block).
+    '''
+    def __init__(self, xpc, signals, numSamples, decimation = 1, numScopes = 2,
+                 scopeType = SCTYPE.HOST, capacity = 16):
+        if numScopes < 2:
+            raise ValueError('at least 2 scopes are needed')
+        
+        self._xpc = xpc
+        self._signals = [int(signal) for signal in signals]
+        self._numSamples = numSamples
+        self._decimation = decimation
+        self._frameTime = numSamples * decimation * xpc.getSampleTime()
+        
+        self.buffer = RingBuffer(capacity, numSamples, len(self._signals))
+        self.dropped = 0
+        self.restarts = 0
+        self._sequence = 0
+        self._lastStart = None
+        self._thread = None
+        self._stop = threading.Event()
+        self._error = None
+        
+        self._scopes = []
+        try:
+            for _ in range(numScopes):
+                self._scopes.append(self._addScope(scopeType))
+        except Exception:
+            self.close()
+            raise
+        
+        # Chain the scopes: each scope is triggered by the end of the previous one
+        for i, scope in enumerate(self._scopes):
+            scope.setTriggerMode(TRIGMD.SCEND)
+            scope.setTriggerScope(self._scopes[i - 1])
+    
+    def _addScope(self, scopeType):
+        scope = self._xpc.addScope(scopeType)
+        for signal in self._signals:
+            scope.addSignal(signal)
+        scope.setNumSamples(self._numSamples)
+        scope.setDecimation(self._decimation)
+        scope.setAutoRestart(False)
+        return scope
+    
+    def start(self):
+        '''Arm all scopes, trigger the first one and start downloading'''
+        for scope in self._scopes:
+            scope.start()
+        self._scopes[0].softwareTrigger()
+        
+        self._stop.clear()
+        self._thread = threading.Thread(target = self._run, daemon = True)
+        self._thread.start()
+        
+    def stop(self):
+        '''Stop downloading and stop the scopes'''
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        for scope in self._scopes:
+            scope.stop()
+    
+    def close(self):
+        if self._thread is not None:
+            self.stop()
+        for scope in self._scopes:
+            self._xpc.remScope(int(scope))
+        self._scopes = []
+    
+    def _waitFinished(self, scope):
+        '''
+        Wait until scope is finished, returns False if stopped and None if the
+        scope did not finish within 20 polls (at least twice the acquisition
+        time)
+        '''
+        for poll in range(20):
+            if self._stop.is_set():
+                return False
+            if scope.isFinished():
+                return True
+            self._stop.wait(self._frameTime / 10)
+        return None
+    
+    def _restart(self, i):
+        '''Re-arm all scopes and trigger scope i'''
+        for scope in self._scopes:
+            scope.stop()
+        for scope in self._scopes:
+            scope.start()
+        self._scopes[i].softwareTrigger()
+        self.restarts += 1
+            
+    def _run(self):
+        try:
+            i = 0
+            while True:
+                finished = self._waitFinished(self._scopes[i])
+                if finished is None:
+                    self._restart(i)
+                    continue
+                if not finished:
+                    break
+                
+                scope = self._scopes[i]
+                
+                startTime = scope.getStartTime()
+                scope.getData(self._signals, numSamples = self._numSamples, out = self.buffer.slot())
+                scope.start()
+                
+                self._addFrame(startTime)
+                i = (i + 1) % len(self._scopes)
+                
+        except Exception as e:
+            self._error = e
+            self.buffer.close()
+            
+    def _addFrame(self, startTime):
+        if self._lastStart is not None:
+            # Number of frames that fit in between, rounded
+            lost = int((startTime - self._lastStart) / self._frameTime + 0.5) - 1
+            if lost > 0:
+                self.dropped += lost
+                self._sequence += lost
+                
+        self._lastStart = startTime
+        self.buffer.put(self._sequence, startTime)
+        self._sequence += 1
+        
+    def read(self, timeout = None):
+        '''Get the next Frame, or None if there is none within timeout'''
+        frame = self.buffer.get(timeout)
+        if frame is None and self._error is not None:
+            raise self._error
+        return frame
+    
+    def frames(self, timeout = None):
+        '''Iterate over the frames, until the acquisition is stopped or no frame comes within timeout'''
+        while True:
+            frame = self.read(timeout if self._thread is not None else 0)
+            if frame is None:
+                return
+            yield frame
+    
+    def __enter__(self):
+        self.start()
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
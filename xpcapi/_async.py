@@ -0,0 +1,167 @@
+# BSD 3-Clause License
+# 
+# Copyright (c) 2018, DEMCON advanced mechatronics
+# All rights reserved.
+# 
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# 
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+# 
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+# 
+# * Neither the name of the copyright holder nor the names of its
+#   contributors may be used to endorse or promote products derived from
+#   this software without specific prior written permission.
+# 
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+# 
+'''
+asyncio interface
+
+'''
+
+import asyncio
+import concurrent.futures
+import functools
+import inspect
+import io
+
+
+class _AsyncProxy:
+    '''
+    Exposes the methods of an object as coroutines that run on the executor
+    of an AsyncXpcApi
+    
+    Attributes that are not methods (e.g. properties) are returned as is, on
+    the calling thread.
+    '''
+    def __init__(self, conn, obj):
+        self._conn = conn
+        self._obj = obj
+    
+    def __getattr__(self, name):
+        if name.startswith('__'):
+            raise AttributeError(name)
+        
+        attr = getattr(type(self._obj), name, None)
+        if not inspect.isroutine(attr):
+            return getattr(self._obj, name)
+        
+        method = getattr(self._obj, name)
+        conn = self._conn
+        
+        @functools.wraps(method)
+        async def call(*args, **kwargs):
+            return conn._wrap(await conn._call(method, *args, **kwargs))
+        return call
+    
+    def __dir__(self):
+        return sorted(set(dir(type(self))) | set(dir(self._obj)))
+    
+    def __repr__(self):
+        return '<async %r>' % (self._obj,)
+
+
+class AsyncXpcScope(_AsyncProxy):
+    '''An XpcScope with coroutine methods, see AsyncXpcApi'''
+    def __int__(self):
+        return int(self._obj)
+    
+    async def iterData(self, *args, **kwargs):
+        '''Asynchronous version of XpcScope.iterData, an async generator'''
+        chunks = self._obj.iterData(*args, **kwargs)
+        done = object()
+        while True:
+            chunk = await self._conn._call(next, chunks, done)
+            if chunk is done:
+                return
+            yield chunk
+
+
+class AsyncXpcFile(_AsyncProxy):
+    '''An XpcFile (or buffered XpcFile) with coroutine methods, see AsyncXpcApi'''
+    async def __aenter__(self):
+        return self
+    
+    async def __aexit__(self, *exc):
+        await self.close()
+
+
+class AsyncXpcApi(_AsyncProxy):
+    '''
+    An XpcApi with coroutine methods
+    
+    All methods of XpcApi are available as coroutines. The calls of one
+    AsyncXpcApi run on its own single-thread executor, so they are executed
+    in the order they were made, without blocking the event loop. Scopes and
+    files returned by the methods are wrapped in AsyncXpcScope and
+    AsyncXpcFile, whose methods run on the same executor:
+    
+        api = AsyncXpcApi()
+        await api.openTcpIpPort('192.168.0.10', '22222')
+        scope = await api.addScope(SCTYPE.HOST)
+        await scope.addSignal(0)
+        
+        async with await api.openFile('C:\\data.dat') as f:
+            data = await f.read()
+    
+    The arguments are passed to XpcApi, or pass an existing XpcApi as api.
+    Properties (e.g. params, scopes) are accessed directly on the calling
+    thread; use getModel() to load the model on the executor.
+    '''
+    def __init__(self, *args, api = None, **kwargs):
+        if api is None:
+            from . import XpcApi
+            api = XpcApi(*args, **kwargs)
+        super().__init__(self, api)
+        self._executor = concurrent.futures.ThreadPoolExecutor(1, thread_name_prefix = 'xpcapi')
+    
+    @property
+    def api(self):
+        '''The wrapped XpcApi'''
+        return self._obj
+    
+    async def _call(self, fn, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(fn, *args, **kwargs))
+    
+    def _wrap(self, value):
+        from . import XpcScope, XpcFile
+        
+        if isinstance(value, XpcScope):
+            return AsyncXpcScope(self, value)
+        if isinstance(value, (XpcFile, io.BufferedIOBase)):
+            return AsyncXpcFile(self, value)
+        if isinstance(value, dict) and any(isinstance(v, XpcScope) for v in value.values()):
+            return {key: self._wrap(v) for key, v in value.items()}
+        if isinstance(value, list) and any(isinstance(v, XpcScope) for v in value):
+            return [self._wrap(v) for v in value]
+        return value
+    
+    async def getModel(self):
+        '''Load the model of the target application on the executor'''
+        return await self._call(getattr, self._obj, 'model')
+    
+    async def close(self):
+        '''Wait for the pending calls and shut down the executor'''
+        await self._call(lambda: None)
+        self._executor.shutdown()
+    
+    async def __aenter__(self):
+        return self
+    
+    async def __aexit__(self, *exc):
+        await self.close()
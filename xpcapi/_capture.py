@@ -0,0 +1,188 @@
+# BSD 3-Clause License
+# 
+# Copyright (c) 2018, DEMCON advanced mechatronics
+# All rights reserved.
+# 
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# 
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+# 
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+# 
+# * Neither the name of the copyright holder nor the names of its
+#   contributors may be used to endorse or promote products derived from
+#   this software without specific prior written permission.
+# 
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+# 
+'''
+Triggered multi-scope capture
+
+'''
+
+from collections import namedtuple
+import time
+
+import numpy as np
+
+from ._xpcapi import TRIGMD, TRIGSLOPE
+
+# time: (samples,) array, data: (samples, signals) array, signals: the signal
+# index of each column of data
+CaptureResult = namedtuple('CaptureResult', 'time, data, signals')
+
+
+class Capture:
+    '''
+    Captures the signals of a set of scopes on a common trigger
+    
+    The first scope is the trigger master: it is triggered by software
+    (trigger()) or, if triggerSignal is given, by a signal. The other scopes are
+    triggered by the master (TRIGMD.SCOPE), so all scopes start at the same
+    sample. All scopes are configured with the same number of samples and
+    decimation, so their data shares a single time axis.
+    
+    A shot arms the scopes, triggers, waits for all scopes with
+    XpcApi.waitScopes and downloads all data into one CaptureResult. When
+    downloading, every scope is re-armed right after its data has been
+    transferred (the master last), so the next shot is armed while the
+    remaining scopes are downloaded:
+    
+        capture = Capture(api, scopes, numSamples = 1000)
+        for i in range(10):
+            result = capture.shot()
+    '''
+    def __init__(self, xpc, scopes, numSamples, decimation = 1, triggerSignal = None,
+                 triggerLevel = 0.0, triggerSlope = TRIGSLOPE.EITHER, numPrePostSamples = 0):
+        self._xpc = xpc
+        self._scopes = list(scopes)
+        self._numSamples = numSamples
+        self._decimation = decimation
+        self._triggerSignal = triggerSignal
+        self._triggerLevel = triggerLevel
+        self._triggerSlope = triggerSlope
+        self._numPrePostSamples = numPrePostSamples
+        self._sampleTime = xpc.getSampleTime()
+        self._armed = False
+        self._startedAt = None
+        self._signals = None
+    
+    @property
+    def master(self):
+        return self._scopes[0]
+    
+    def configure(self):
+        '''Apply the trigger and acquisition settings to all scopes'''
+        master = self.master
+        
+        for scope in self._scopes:
+            config = scope.getConfig()._replace(
+                numSamples = self._numSamples,
+                decimation = self._decimation,
+                numPrePostSamples = self._numPrePostSamples
+                )
+            
+            if scope is master:
+                if self._triggerSignal is None:
+                    config = config._replace(triggerMode = TRIGMD.SOFTWARE)
+                else:
+                    config = config._replace(
+                        triggerMode = TRIGMD.SIGNAL,
+                        triggerSignal = int(self._triggerSignal),
+                        triggerLevel = self._triggerLevel,
+                        triggerSlope = self._triggerSlope
+                        )
+            else:
+                config = config._replace(
+                    triggerMode = TRIGMD.SCOPE,
+                    triggerScope = int(master),
+                    triggerScopeSample = 0
+                    )
+            
+            scope.setConfig(config, diff = True)
+        
+        self._signals = [signal for scope in self._scopes for signal in scope._signalIds()]
+        self._armed = False
+    
+    def arm(self):
+        '''Start all scopes, the master last'''
+        if self._signals is None:
+            self.configure()
+        
+        for scope in reversed(self._scopes):
+            scope.start()
+        self._armed = True
+        self._startedAt = time.monotonic()
+    
+    def trigger(self):
+        '''Trigger the master scope by software'''
+        self.master.softwareTrigger()
+        self._startedAt = time.monotonic()
+    
+    def wait(self, timeout = None):
+        '''
+        Wait until all scopes are finished, returns a WaitResult
+        
+        The expected end of the acquisition is computed from the settings of
+        the capture, without querying the scopes.
+        '''
+        expectedEnd = None
+        if self._startedAt is not None:
+            numSamples = self._numSamples + max(self._numPrePostSamples, 0)
+            expectedEnd = self._startedAt + numSamples * self._decimation * self._sampleTime
+        return self._xpc.waitScopes(self._scopes, timeout, expectedEnd = expectedEnd)
+    
+    def harvest(self, rearm = True):
+        '''
+        Download the data of all scopes into a CaptureResult, re-arming each
+        scope right after its download if rearm is set
+        '''
+        data = np.empty((self._numSamples, len(self._signals)), dtype = np.float64, order = 'F')
+        startTime = self.master.getStartTime()
+        
+        # The master is downloaded (and re-armed) last, so that the other scopes
+        # are armed again before it can trigger them
+        column = len(self._signals)
+        for scope in reversed(self._scopes):
+            signals = scope._signalIds()
+            column -= len(signals)
+            scope.getData(signals, numSamples = self._numSamples, 
+                          out = data[:, column:column + len(signals)])
+            if rearm:
+                scope.start()
+        self._armed = rearm
+        if rearm:
+            self._startedAt = time.monotonic()
+        
+        times = startTime + np.arange(self._numSamples) * (self._decimation * self._sampleTime)
+        return CaptureResult(times, data, list(self._signals))
+    
+    def shot(self, timeout = None):
+        '''
+        Arm (if needed), trigger (if software triggered), wait and harvest,
+        leaving the scopes armed for the next shot
+        
+        Raises TimeoutError if the scopes do not finish within timeout.
+        '''
+        if not self._armed:
+            self.arm()
+        if self._triggerSignal is None:
+            self.trigger()
+        
+        if not self.wait(timeout).finished:
+            raise TimeoutError('capture did not finish within %s s' % timeout)
+        
+        return self.harvest()
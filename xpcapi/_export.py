@@ -0,0 +1,219 @@
+# BSD 3-Clause License
+# 
+# Copyright (c) 2018, DEMCON advanced mechatronics
+# All rights reserved.
+# 
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# 
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+# 
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+# 
+# * Neither the name of the copyright holder nor the names of its
+#   contributors may be used to endorse or promote products derived from
+#   this software without specific prior written permission.
+# 
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+# 
+'''
+Streaming export of scope and log data to columnar files
+
+A column store is a directory with a header.json file and one raw float64
+(little endian) file per column:
+
+    header.json     {"names": [...], "sampleTime": ..., "decimation": ...,
+                     "length": ...}
+    0.f64, 1.f64, ...
+
+Data is appended chunk by chunk, so memory use does not depend on the size of
+the capture, and the columns are read lazily as np.memmap arrays.
+
+'''
+
+import json
+import os
+
+import numpy as np
+
+HEADER = 'header.json'
+DTYPE = np.dtype('<f8')
+
+
+class ColumnWriter:
+    '''
+    Appends (samples, columns) chunks to a column store
+    
+    If the store exists and append is set, the chunks are appended to it (the
+    names should match), otherwise a new store is created.
+    '''
+    def __init__(self, path, names, sampleTime = None, decimation = 1, append = False):
+        self.path = path
+        self.names = list(names)
+        self.sampleTime = sampleTime
+        self.decimation = decimation
+        self.length = 0
+        
+        mode = 'wb'
+        if append and os.path.exists(os.path.join(path, HEADER)):
+            store = ColumnStore(path)
+            if store.names != self.names:
+                raise ValueError('column names do not match those of %s' % path)
+            self.sampleTime = store.sampleTime
+            self.decimation = store.decimation
+            self.length = len(store)
+            mode = 'ab'
+        else:
+            os.makedirs(path, exist_ok = True)
+        
+        self._files = []
+        for column in range(len(self.names)):
+            f = open(os.path.join(path, '%d.f64' % column), mode)
+            # Drop a partially written tail (e.g. after a crash)
+            f.truncate(self.length * DTYPE.itemsize)
+            self._files.append(f)
+        self._writeHeader()
+    
+    def write(self, chunk):
+        '''Append a (samples, columns) array'''
+        chunk = np.asarray(chunk, dtype = DTYPE)
+        if chunk.ndim == 1:
+            chunk = chunk[:, None]
+        if chunk.shape[1] != len(self._files):
+            raise ValueError('expected %d columns, got %d' % (len(self._files), chunk.shape[1]))
+        
+        for column, f in enumerate(self._files):
+            chunk[:, column].tofile(f)
+        self.length += chunk.shape[0]
+    
+    def _writeHeader(self):
+        header = {'names': self.names, 'sampleTime': self.sampleTime,
+                  'decimation': self.decimation, 'length': self.length}
+        
+        tmppath = os.path.join(self.path, HEADER + '.tmp')
+        with open(tmppath, 'w') as f:
+            json.dump(header, f)
+        os.replace(tmppath, os.path.join(self.path, HEADER))
+    
+    def flush(self):
+        '''Flush the columns and update the header'''
+        for f in self._files:
+            f.flush()
+        self._writeHeader()
+    
+    def close(self):
+        if self._files:
+            self.flush()
+            for f in self._files:
+                f.close()
+            self._files = []
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
+
+
+class ColumnStore:
+    '''
+    A column store opened for reading
+    
+    Columns are returned as read-only np.memmap arrays, by name or by index:
+    
+        store = ColumnStore('capture')
+        store['Sine Wave'][1000:2000]
+    '''
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, HEADER)) as f:
+            header = json.load(f)
+        
+        self.names = header['names']
+        self.sampleTime = header['sampleTime']
+        self.decimation = header['decimation']
+        
+        # The length in the header is only updated on flush, the column files
+        # always hold the data that was written
+        sizes = [os.path.getsize(self._columnPath(column)) for column in range(len(self.names))]
+        self._length = min(sizes) // DTYPE.itemsize if sizes else 0
+    
+    def _columnPath(self, column):
+        return os.path.join(self.path, '%d.f64' % column)
+    
+    def __len__(self):
+        return self._length
+    
+    def __getitem__(self, key):
+        column = key if isinstance(key, int) else self.names.index(key)
+        if self._length == 0:
+            return np.empty(0, dtype = DTYPE)
+        return np.memmap(self._columnPath(column), dtype = DTYPE, mode = 'r', shape = (self._length,))
+    
+    @property
+    def time(self):
+        '''The time axis relative to the first sample, if the sample time is known'''
+        if self.sampleTime is None:
+            return None
+        return np.arange(self._length) * (self.sampleTime * self.decimation)
+    
+    def columns(self):
+        return [self[column] for column in range(len(self.names))]
+
+
+def exportScope(scope, path, chunk = 4096, signals = None, decimation = 1, append = False):
+    '''
+    Stream the data of a scope into a column store, chunk samples at a time
+    
+    The columns are named after the signals.
+    '''
+    xpc = scope._xpc
+    signals, numSamples = scope._dataArgs(signals, None)
+    names = [xpc.getSignalName(signal) for signal in signals]
+    
+    with ColumnWriter(path, names, xpc.getSampleTime(), scope.getDecimation() * decimation, 
+                      append) as writer:
+        for data in scope.iterData(chunk, signals, 0, numSamples, decimation):
+            writer.write(data)
+    return ColumnStore(path)
+
+
+def exportLog(reader, path, timeout = None, interval = 0.1, append = False):
+    '''
+    Stream the new samples of a LogReader into a column store
+    
+    Without timeout, the samples that are available now are exported,
+    otherwise the log is followed for timeout seconds.
+    '''
+    xpc = reader._xpc
+    if reader.kind in ('output', 'state'):
+        names = ['%s%d' % (reader.kind, id) for id in reader.ids]
+    else:
+        names = [reader.kind]
+    
+    with ColumnWriter(path, names, xpc.getSampleTime(), reader.decimation, append) as writer:
+        if timeout is None:
+            # Samples logged while exporting are left for the next poll
+            remaining = reader.available()
+            while remaining > 0:
+                data = reader.poll(min(reader.chunk, remaining))
+                if not len(data):
+                    break
+                writer.write(data)
+                remaining -= len(data)
+        else:
+            for data in reader.stream(interval, timeout):
+                writer.write(data)
+    return ColumnStore(path)
@@ -0,0 +1,175 @@
+# BSD 3-Clause License
+# 
+# Copyright (c) 2018, DEMCON advanced mechatronics
+# All rights reserved.
+# 
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# 
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+# 
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+# 
+# * Neither the name of the copyright holder nor the names of its
+#   contributors may be used to endorse or promote products derived from
+#   this software without specific prior written permission.
+# 
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+# 
+'''
+Incremental log reader
+
+'''
+
+import ctypes
+import time
+
+import numpy as np
+
+
+class LogReader:
+    '''
+    Reads the output, state, time or TET log of the target application
+    incrementally
+    
+    The reader keeps the absolute position of the next sample to read, so every
+    poll only transfers the samples that were logged since the previous poll.
+    
+    The target log is a ring buffer of maxLogSamples samples. The absolute
+    number of logged samples is taken as
+    
+        numLogWraps * maxLogSamples + numLogSamples
+    
+    i.e. numLogSamples is assumed to be the write position in the current pass
+    through the buffer, and sample s is stored at position s % maxLogSamples.
+    Samples that were overwritten before they could be read are skipped and
+    counted in lost. If the absolute count goes backwards (the application
+    was restarted), the reader starts over at the beginning of the log.
+    
+    kind is one of 'output', 'state', 'time' or 'tet'. For outputs and states,
+    ids selects the logged outputs or states (default: all). With decimation
+    > 1, only every decimation-th sample is transferred; the decimation phase
+    is kept across polls.
+    
+        reader = LogReader(api, 'output')
+        while running:
+            data = reader.poll()    # (new samples, outputs) array
+    '''
+    KINDS = ('output', 'state', 'time', 'tet')
+    
+    def __init__(self, xpc, kind = 'output', ids = None, decimation = 1, chunk = 65536, fromStart = False):
+        if kind not in self.KINDS:
+            raise ValueError('kind should be one of %s' % (self.KINDS,))
+        
+        self._xpc = xpc
+        self.kind = kind
+        self.decimation = decimation
+        self.chunk = chunk
+        
+        if kind == 'output':
+            self.ids = list(range(xpc.getNumOutputs())) if ids is None else list(ids)
+        elif kind == 'state':
+            self.ids = list(range(xpc.getNumStates())) if ids is None else list(ids)
+        else:
+            self.ids = [None]
+        
+        self.lost = 0
+        self.position = 0 if fromStart else self._total()[0]
+    
+    def _total(self):
+        '''Return the absolute number of logged samples and the log size'''
+        size = self._xpc.maxLogSamples()
+        return self._xpc.numLogWraps() * size + self._xpc.numLogSamples(), size
+    
+    def _get(self, start, numSamples, column, id):
+        data = column.ctypes.data_as(ctypes.POINTER(ctypes.c_double))
+        if self.kind == 'output':
+            self._xpc.getOutputLog(start, numSamples, self.decimation, id, data)
+        elif self.kind == 'state':
+            self._xpc.getStateLog(start, numSamples, self.decimation, id, data)
+        elif self.kind == 'time':
+            self._xpc.getTimeLog(start, numSamples, self.decimation, data)
+        else:
+            self._xpc.getTETLog(start, numSamples, self.decimation, data)
+    
+    def _segments(self, total, size, limit):
+        '''
+        Yield (start, numSamples, rows) for the new samples, split at the end of
+        the ring buffer and into chunks, and advance position
+        '''
+        while self.position < total and limit > 0:
+            start = self.position % size
+            count = min(total - self.position, size - start, self.chunk * self.decimation,
+                        limit * self.decimation)
+            rows = -(-count // self.decimation)
+            
+            yield start, count, rows
+            self.position += rows * self.decimation
+            limit -= rows
+    
+    def available(self):
+        '''Return the number of (decimated) samples a poll would return'''
+        total, size = self._total()
+        position = self._sync(total, size)
+        return max(0, -(-(total - position) // self.decimation))
+    
+    def _sync(self, total, size):
+        '''Account for a restarted log and lost samples, return the position'''
+        if total < self.position - self.decimation:
+            self.position = 0
+        
+        oldest = total - size
+        if self.position < oldest:
+            skipped = -(-(oldest - self.position) // self.decimation) * self.decimation
+            self.lost += skipped
+            self.position += skipped
+        
+        return self.position
+    
+    def poll(self, maxSamples = None):
+        '''
+        Return the samples logged since the previous poll as a
+        (samples, ids) float64 array, at most maxSamples (decimated) samples
+        '''
+        total, size = self._total()
+        self._sync(total, size)
+        
+        rows = max(0, -(-(total - self.position) // self.decimation))
+        if maxSamples is not None:
+            rows = min(rows, maxSamples)
+        
+        out = np.empty((rows, len(self.ids)), dtype = np.float64, order = 'F')
+        row = 0
+        for start, count, n in self._segments(total, size, rows):
+            for column, id in enumerate(self.ids):
+                self._get(start, count, out[row:row + n, column], id)
+            row += n
+        
+        return out
+    
+    def stream(self, interval = 0.1, timeout = None):
+        '''
+        Poll every interval seconds and yield the new samples in arrays of at
+        most chunk (decimated) samples, until timeout seconds have passed
+        (default: forever)
+        '''
+        end = None if timeout is None else time.monotonic() + timeout
+        
+        while end is None or time.monotonic() < end:
+            data = self.poll(self.chunk)
+            if len(data):
+                yield data
+            if len(data) < self.chunk:
+                time.sleep(interval)
@@ -0,0 +1,252 @@
+# BSD 3-Clause License
+# 
+# Copyright (c) 2018, DEMCON advanced mechatronics
+# All rights reserved.
+# 
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# 
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+# 
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+# 
+# * Neither the name of the copyright holder nor the names of its
+#   contributors may be used to endorse or promote products derived from
+#   this software without specific prior written permission.
+# 
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+# 
+'''
+Model metadata tables and their on-disk cache
+
+'''
+
+import ctypes
+import hashlib
+import io
+import json
+import os
+import re
+from collections import namedtuple
+from xml.etree import ElementTree
+
+from ._xpcapi import XpcError
+
+# Signal and parameter metadata of an application, indexed by signal and
+# parameter index. paramDims and paramTypes may be None when not fetched.
+ModelTables = namedtuple('ModelTables', 
+    'signalNames, signalLabels, paramBlocks, paramNames, paramDims, paramTypes')
+
+
+def fetchModelTables(xpc, paramInfo = True):
+    '''
+    Fetch the ModelTables of the loaded application from the target
+    
+    If paramInfo is False, the parameter dims and types are not fetched.
+    '''
+    numSignals = xpc.getNumSignals()
+    signalNames = [xpc.getSignalName(i) for i in range(numSignals)]
+    signalLabels = [xpc.getSignalLabel(i) for i in range(numSignals)]
+    
+    numParams = xpc.getNumParams()
+    if not paramInfo:
+        names = [xpc.params.name(i) for i in range(numParams)]
+        return ModelTables(
+            signalNames, signalLabels,
+            [block for block, _ in names], [name for _, name in names],
+            None, None
+            )
+    
+    params = [xpc.params.info(i) for i in range(numParams)]
+    
+    return ModelTables(
+        signalNames, signalLabels,
+        [p.block for p in params], [p.name for p in params],
+        [p.dims for p in params], [p.type for p in params]
+        )
+
+
+def _field(elem, *names):
+    '''Get a field of an XML element, from an attribute or from a child element'''
+    for name in names:
+        for key, value in elem.attrib.items():
+            if key.rpartition('}')[2].lower() == name:
+                return value
+        for child in elem:
+            if child.tag.rpartition('}')[2].lower() == name:
+                return child.text or ''
+    return None
+
+
+def _parseDims(text):
+    dims = tuple(int(d) for d in re.findall(r'\d+', text))
+    if len(dims) != 2:
+        raise ValueError('invalid parameter dims %r' % text)
+    return dims
+
+
+def parseModelXML(source, numSignals, numParams):
+    '''
+    Parse the model description XML of the target into ModelTables
+    
+    The XML is parsed incrementally with iterparse. Signals are read from
+    'signal' elements and parameters from 'parameter' (or 'param') elements,
+    taking the fields (index, name, label, block, dims, type) from either
+    attributes or child elements, case-insensitively. A ValueError is raised
+    when the XML does not describe exactly numSignals signals and numParams
+    parameters.
+    '''
+    signalNames = [None] * numSignals
+    signalLabels = [''] * numSignals
+    paramBlocks = [None] * numParams
+    paramNames = [None] * numParams
+    paramDims = [None] * numParams
+    paramTypes = [None] * numParams
+    
+    for _, elem in ElementTree.iterparse(source):
+        tag = elem.tag.rpartition('}')[2].lower()
+        
+        if tag == 'signal':
+            index = int(_field(elem, 'index', 'idx', 'id'))
+            name = _field(elem, 'name', 'path')
+            block = _field(elem, 'block', 'blockpath')
+            if block and not name.startswith(block + '/'):
+                name = block + '/' + name
+            signalNames[index] = name
+            signalLabels[index] = _field(elem, 'label') or ''
+            
+        elif tag in ('parameter', 'param'):
+            index = int(_field(elem, 'index', 'idx', 'id'))
+            name = _field(elem, 'name')
+            block = _field(elem, 'block', 'blockpath')
+            if block is None:
+                block, _, name = name.rpartition('/')
+            paramBlocks[index] = block
+            paramNames[index] = name
+            dims = _field(elem, 'dims', 'dimensions')
+            paramDims[index] = None if dims is None else _parseDims(dims)
+            paramTypes[index] = _field(elem, 'type', 'datatype')
+            
+        else:
+            continue
+        
+        # Signals and parameters are processed as they are parsed, no need to keep them
+        elem.clear()
+    
+    if None in signalNames or None in paramNames:
+        raise ValueError('XML does not describe all signals and parameters')
+    
+    return ModelTables(
+        signalNames, signalLabels, paramBlocks, paramNames,
+        None if None in paramDims else paramDims,
+        None if None in paramTypes else paramTypes
+        )
+
+
+def fetchModelTablesXML(xpc):
+    '''
+    Fetch the ModelTables of the loaded application from the model description
+    XML of the target, in a single transfer
+    
+    Returns None if the target does not provide a (usable) XML description.
+    '''
+    try:
+        size = xpc.getXMLSize()
+        if size <= 0:
+            return None
+        
+        buffer = (ctypes.c_ubyte * size)()
+        xpc.readXML(size, buffer)
+        
+        # The XML may be zero-terminated
+        data = bytes(buffer).partition(b'\0')[0]
+        
+        return parseModelXML(io.BytesIO(data), xpc.getNumSignals(), xpc.getNumParams())
+    
+    except (XpcError, ValueError, IndexError, TypeError, AttributeError, ElementTree.ParseError):
+        return None
+
+
+def defaultCacheDir():
+    '''The directory used for XpcApi(modelCache = True)'''
+    return os.environ.get('XPCAPI_CACHE_DIR',
+                          os.path.join(os.path.expanduser('~'), '.xpcapi', 'cache'))
+
+
+def hashFile(filename):
+    sha = hashlib.sha1()
+    with open(filename, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            sha.update(chunk)
+    return sha.hexdigest()
+    
+
+class ModelCache:
+    '''
+    Stores ModelTables on disk, one file per application name
+    
+    A cache file is only used when its key matches the application on the
+    target: the application name, the number of signals and parameters and,
+    when both are known, the hash of the .dlm file.
+    '''
+    def __init__(self, directory):
+        self.directory = directory
+        
+    def key(self, xpc, appHash = None):
+        '''Get the key of the application loaded on the target (3 calls)'''
+        return {
+            'appName': xpc.getAppName(),
+            'numSignals': xpc.getNumSignals(),
+            'numParams': xpc.getNumParams(),
+            'appHash': appHash
+            }
+    
+    def path(self, key):
+        return os.path.join(self.directory, re.sub(r'[^\w.-]', '_', key['appName']) + '.json')
+    
+    @staticmethod
+    def _matches(stored, key):
+        for field in ('appName', 'numSignals', 'numParams'):
+            if stored.get(field) != key[field]:
+                return False
+        
+        # Only compare the hashes if both are known
+        return not (stored.get('appHash') and key['appHash'] and stored['appHash'] != key['appHash'])
+    
+    def load(self, key):
+        '''Returns the cached ModelTables for key, or None if there are none'''
+        try:
+            with open(self.path(key), 'r') as f:
+                data = json.load(f)
+        except (IOError, ValueError):
+            return None
+        
+        if not self._matches(data.get('key', {}), key):
+            return None
+        
+        tables = data['tables']
+        if tables['paramDims'] is not None:
+            tables['paramDims'] = [tuple(dims) for dims in tables['paramDims']]
+        return ModelTables(**tables)
+    
+    def save(self, key, tables):
+        path = self.path(key)
+        os.makedirs(self.directory, exist_ok = True)
+        
+        # Write to a temporary file first, so that readers never see a partial file
+        tmppath = path + '.tmp'
+        with open(tmppath, 'w') as f:
+            json.dump({'key': key, 'tables': tables._asdict()}, f)
+        os.replace(tmppath, path)
@@ -0,0 +1,284 @@
+# BSD 3-Clause License
+# 
+# Copyright (c) 2018, DEMCON advanced mechatronics
+# All rights reserved.
+# 
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# 
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+# 
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+# 
+# * Neither the name of the copyright holder nor the names of its
+#   contributors may be used to endorse or promote products derived from
+#   this software without specific prior written permission.
+# 
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+# 
+'''
+Connections to many targets
+
+'''
+
+from collections import namedtuple
+import concurrent.futures
+import threading
+
+import numpy as np
+
+from ._logreader import LogReader
+from ._xpcapi import XpcError
+
+# values: array indexed by target (NaN for failed targets), errors: dict
+# {target: exception} of the failed targets
+PoolResult = namedtuple('PoolResult', 'values, errors')
+
+# values: (targets, samples, columns) array, padded with NaN beyond the length
+# of the log of a target, lengths: number of samples per target
+LogsResult = namedtuple('LogsResult', 'values, lengths, errors')
+
+
+class XpcTargetPool:
+    '''
+    A pool of connections to a number of targets, for running operations on
+    all targets in parallel
+    
+    targets is a list of addresses, or (address, port) tuples. Connections are
+    opened on first use (or with connect()) and reused. A connection is
+    discarded, and opened again on the next operation, when it fails a health
+    check, times out, or raises XpcError while the target does not respond to
+    a ping. The other keyword arguments are passed to XpcApi.
+    
+    Every operation runs on all targets in parallel, each target on its own
+    thread, and waits at most timeout seconds. The results are NumPy arrays
+    indexed by target, in the order of targets:
+    
+        pool = XpcTargetPool(['192.168.0.%d' % i for i in range(10, 34)])
+        result = pool.readSignals(['Plant/Motor/s1', 'Plant/Motor/s2'])
+        result.values       # (24, 2) array
+        result.errors       # {address: exception} of the failed targets
+    
+    A call that times out cannot be aborted; the target reports an error until
+    the call has returned, after which its connection is closed. Every
+    connection has its own copy of the dll and its own lock (see XpcApi), so a
+    target that hangs does not delay the others. A call that timed out before
+    it got to the target (e.g. waiting for a worker thread, or for the lock
+    with privateDll = False) is abandoned, and the connection is kept.
+    '''
+    def __init__(self, targets, port = '22222', timeout = 10.0, maxWorkers = None, **apiKwargs):
+        self.targets = []
+        self._addresses = {}
+        for target in targets:
+            address, targetPort = target if isinstance(target, tuple) else (target, port)
+            self.targets.append(address)
+            self._addresses[address] = (address, str(targetPort))
+        
+        self.timeout = timeout
+        self._apiKwargs = apiKwargs
+        self._apis = {}
+        self._groups = {}
+        self._busy = {}
+        self._stateLock = threading.Lock()
+        self._executor = concurrent.futures.ThreadPoolExecutor(
+            maxWorkers or len(self.targets), thread_name_prefix = 'xpctargetpool')
+    
+    def _drop(self, target):
+        '''
+        Discard the connection to target. If a call on it is still running,
+        the port is closed when that call returns.
+        '''
+        api = self._apis.pop(target, None)
+        self._groups.pop(target, None)
+        if api is None:
+            return
+        
+        def close(future = None):
+            try:
+                api.closePort()
+            except Exception:
+                pass
+        
+        busy = self._busy.get(target)
+        if busy is not None and not busy.done():
+            busy.add_done_callback(close)
+        else:
+            close()
+    
+    def _call(self, fn, target, state):
+        '''
+        Call fn(target, api) on the connection to target (opened if needed),
+        unless map() abandoned the call before it got the lock of the
+        connection
+        '''
+        api = self._apis.get(target)
+        if api is None:
+            from . import XpcApi
+            api = XpcApi(**self._apiKwargs)
+        
+        with api._lock:
+            with self._stateLock:
+                if state['abandoned']:
+                    raise TimeoutError('abandoned')
+                state['started'] = True
+            
+            if target not in self._apis:
+                api.openTcpIpPort(*self._addresses[target])
+                self._apis[target] = api
+                self._groups[target] = {}
+            
+            try:
+                return fn(target, api)
+            except XpcError:
+                if not api._ping():
+                    self._drop(target)
+                raise
+    
+    def map(self, fn, timeout = None):
+        '''
+        Call fn(target, api) for all targets in parallel
+        
+        Returns a list of the results (None for failed targets) and a dict
+        {target: exception} of the failed targets.
+        '''
+        if timeout is None:
+            timeout = self.timeout
+        
+        futures = {}
+        states = {}
+        errors = {}
+        for target in self.targets:
+            busy = self._busy.get(target)
+            if busy is not None and not busy.done():
+                errors[target] = TimeoutError('a previous call to %s is still running' % target)
+                continue
+            states[target] = {'started': False, 'abandoned': False}
+            futures[target] = self._busy[target] = self._executor.submit(
+                self._call, fn, target, states[target])
+        
+        concurrent.futures.wait(futures.values(), timeout)
+        
+        results = []
+        for target in self.targets:
+            future = futures.get(target)
+            if future is None:
+                results.append(None)
+            elif not future.done():
+                with self._stateLock:
+                    started = states[target]['started']
+                    states[target]['abandoned'] = not started
+                if started:
+                    errors[target] = TimeoutError('%s did not respond within %s s' % (target, timeout))
+                    self._drop(target)
+                else:
+                    errors[target] = TimeoutError('the call to %s did not start within %s s' % (target, timeout))
+                    future.cancel()
+                results.append(None)
+            elif future.exception() is not None:
+                errors[target] = future.exception()
+                results.append(None)
+            else:
+                results.append(future.result())
+        return results, errors
+    
+    def _gather(self, fn, timeout, shape = ()):
+        results, errors = self.map(fn, timeout)
+        values = np.full((len(self.targets),) + shape, np.nan)
+        for i, result in enumerate(results):
+            if result is not None:
+                values[i] = result
+        return PoolResult(values, errors)
+    
+    def connect(self, timeout = None):
+        '''Open the connections to all targets, returns {target: exception}'''
+        return self.map(lambda target, api: None, timeout)[1]
+    
+    def healthCheck(self, timeout = None):
+        '''
+        Ping all targets, returns a PoolResult with 1 for targets that respond
+        and NaN for the others. Connections to failing targets are closed
+        (except when the ping did not get to start).
+        '''
+        def ping(target, api):
+            if not api.targetPing():
+                raise ConnectionError('%s does not respond' % target)
+            return 1
+        
+        result = self._gather(ping, timeout)
+        for target, error in result.errors.items():
+            # Timeouts were already handled by map()
+            if not isinstance(error, TimeoutError):
+                self._drop(target)
+        return result
+    
+    def readSignals(self, signals, timeout = None):
+        '''
+        Read signals (paths or indices) on all targets, returns a PoolResult
+        with a (targets, signals) array
+        
+        The SignalGroups are kept per connection, so reading the same signals
+        again only costs a single call per target.
+        '''
+        key = tuple(signals)
+        
+        def read(target, api):
+            groups = self._groups[target]
+            group = groups.get(key)
+            if group is None:
+                group = groups[key] = api.signalGroup(list(key))
+            return group.read()
+        
+        return self._gather(read, timeout, (len(key),))
+    
+    def setParam(self, param, value, timeout = None):
+        '''
+        Set a parameter ('block path/name', (block path, name) or index) on all
+        targets, returns a PoolResult with 1 for targets where it was set
+        '''
+        def write(target, api):
+            with api.params.transaction() as transaction:
+                transaction[param] = value
+            return 1
+        
+        return self._gather(write, timeout)
+    
+    def downloadLogs(self, kind = 'output', decimation = 1, timeout = None):
+        '''
+        Download the complete log of kind ('output', 'state', 'time' or 'tet',
+        see LogReader) from all targets, returns a LogsResult
+        '''
+        results, errors = self.map(
+            lambda target, api: LogReader(api, kind, decimation = decimation, fromStart = True).poll(),
+            timeout)
+        
+        lengths = np.array([0 if r is None else r.shape[0] for r in results])
+        columns = max([r.shape[1] for r in results if r is not None], default = 0)
+        values = np.full((len(self.targets), lengths.max(initial = 0), columns), np.nan)
+        for i, result in enumerate(results):
+            if result is not None:
+                values[i, :result.shape[0], :result.shape[1]] = result
+        return LogsResult(values, lengths, errors)
+    
+    def close(self):
+        '''Close all connections'''
+        self._executor.shutdown()
+        for target in list(self._apis):
+            self._drop(target)
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
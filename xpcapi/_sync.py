@@ -0,0 +1,184 @@
+# BSD 3-Clause License
+# 
+# Copyright (c) 2018, DEMCON advanced mechatronics
+# All rights reserved.
+# 
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# 
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+# 
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+# 
+# * Neither the name of the copyright holder nor the names of its
+#   contributors may be used to endorse or promote products derived from
+#   this software without specific prior written permission.
+# 
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+# 
+'''
+Incremental download of target directories
+
+'''
+
+from collections import namedtuple
+import json
+import os
+import queue
+import threading
+
+MANIFEST = '.xpcsync.json'
+
+# copied, skipped: relative paths of the files that were transferred and that
+# were up to date, bytes: number of bytes transferred
+SyncResult = namedtuple('SyncResult', 'copied, skipped, bytes')
+
+
+def walkDir(xpc, remote, relative = ''):
+    '''
+    Yield (local relative path, target path, FileInfo) for all files below a
+    target directory
+    
+    Directories are listed lazily, when the walk reaches them.
+    '''
+    for info in xpc.listDir(remote):
+        if info.name in ('.', '..'):
+            continue
+        path = remote.rstrip('\\') + '\\' + info.name
+        rel = os.path.join(relative, info.name)
+        if info.isdir:
+            yield from walkDir(xpc, path, rel)
+        else:
+            yield rel, path, info
+
+
+class _DiskWriter:
+    '''Writes to local files on a thread, so disk writes overlap transfers'''
+    def __init__(self, chunkSize, numBuffers = 3):
+        self._tasks = queue.Queue()
+        self._free = queue.Queue()
+        for i in range(numBuffers):
+            self._free.put(bytearray(chunkSize))
+        self._error = None
+        self._thread = threading.Thread(target = self._run, daemon = True)
+        self._thread.start()
+    
+    def _run(self):
+        while True:
+            task = self._tasks.get()
+            if task is None:
+                return
+            if self._error is None:
+                try:
+                    task()
+                except BaseException as e:
+                    self._error = e
+    
+    def _check(self):
+        if self._error is not None:
+            raise self._error
+    
+    def buffer(self):
+        self._check()
+        return self._free.get()
+    
+    def write(self, f, buffer, nbytes):
+        def task():
+            try:
+                f.write(memoryview(buffer)[:nbytes])
+            finally:
+                self._free.put(buffer)
+        self._tasks.put(task)
+    
+    def submit(self, task):
+        self._tasks.put(task)
+    
+    def close(self):
+        self._tasks.put(None)
+        self._thread.join()
+        self._check()
+
+
+def _loadManifest(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _saveManifest(path, manifest):
+    tmppath = path + '.tmp'
+    with open(tmppath, 'w') as f:
+        json.dump(manifest, f, indent = 1, sort_keys = True)
+    os.replace(tmppath, path)
+
+
+def syncDir(xpc, remote, local, chunkSize = 1 << 20):
+    '''
+    Copy the new and changed files below a target directory to a local
+    directory, see XpcApi.syncDir
+    '''
+    os.makedirs(local, exist_ok = True)
+    manifestPath = os.path.join(local, MANIFEST)
+    manifest = _loadManifest(manifestPath)
+    
+    copied, skipped, nbytes = [], [], 0
+    writer = _DiskWriter(chunkSize)
+    
+    try:
+        for rel, path, info in walkDir(xpc, remote):
+            key = rel.replace(os.sep, '/')
+            entry = {'size': info.size, 'datetime': info.datetime.isoformat()}
+            target = os.path.join(local, rel)
+            
+            if manifest.get(key) == entry and os.path.exists(target):
+                skipped.append(rel)
+                continue
+            
+            os.makedirs(os.path.dirname(target) or local, exist_ok = True)
+            tmppath = target + '.part'
+            out = open(tmppath, 'wb')
+            
+            try:
+                with xpc.openFile(path, 'r', chunkSize) as f:
+                    while True:
+                        buffer = writer.buffer()
+                        n = f.readinto(buffer)
+                        writer.write(out, buffer, n)
+                        nbytes += n
+                        if n < len(buffer):
+                            break
+            except BaseException:
+                writer.submit(out.close)
+                raise
+            
+            # Runs on the writer thread, after the data has been written
+            def finish(out = out, tmppath = tmppath, target = target, info = info,
+                       key = key, entry = entry, rel = rel):
+                out.close()
+                os.replace(tmppath, target)
+                timestamp = info.datetime.timestamp()
+                os.utime(target, (timestamp, timestamp))
+                manifest[key] = entry
+                copied.append(rel)
+            writer.submit(finish)
+    finally:
+        try:
+            writer.close()
+        finally:
+            _saveManifest(manifestPath, manifest)
+    
+    return SyncResult(copied, skipped, nbytes)